@@ -0,0 +1,60 @@
+import asyncio
+import typing
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, ChatMemberMember, Message, User
+
+
+class FakeSession(BaseSession):
+    """
+    Tarmoqsiz Bot sessiyasi: Bot API so'rovlari xotirada javob qaytaradi.
+    latency soniya bilan Telegram javob vaqtini taqlid qilish mumkin (standart 0).
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: typing.Counter[str] = Counter()
+        self._message_id = 0
+
+    def _message(self, bot: Bot, method: TelegramMethod) -> Message:
+        self._message_id += 1
+        chat_id = getattr(method, "chat_id", None) or 0
+        return Message(
+            message_id=getattr(method, "message_id", None) or self._message_id,
+            date=datetime.now(),
+            chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+            from_user=User(id=bot.id, is_bot=True, first_name="bot"),
+            text=getattr(method, "text", None),
+        )
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: Optional[int] = None) -> TelegramType:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        returning = method.__returning__
+        options = typing.get_args(returning) or (returning,)
+        if Message in options:
+            return self._message(bot, method)
+        if bool in options:
+            return True
+        if ChatMemberMember in options:
+            return ChatMemberMember(user=User(id=getattr(method, "user_id", 0), is_bot=False, first_name="user"))
+        if returning is User:
+            return User(id=bot.id, is_bot=True, first_name="bot")
+        raise NotImplementedError(f"FakeSession {type(method).__name__} ni qo'llab-quvvatlamaydi")
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def close(self) -> None:
+        pass
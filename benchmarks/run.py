@@ -0,0 +1,210 @@
+"""
+Handlerlarning update boshiga narxini o'lchash (tarmoqsiz).
+
+Haqiqiy Dispatcher main.build_dispatcher() orqali yig'iladi, Bot API esa FakeSession bilan
+almashtiriladi. Alohida PostgreSQL bazasi kerak (BENCH_DATABASE_URL, botning DATABASE_URL idan farqli);
+namoz vaqtlari offline hisoblanadi. Faqat shu ishga tushirishda qo'shilgan foydalanuvchilar va ularning
+qatorlari oxirida o'chiriladi.
+
+    BENCH_DATABASE_URL=postgresql://localhost/qazo_bench python -m benchmarks.run
+    BENCH_DATABASE_URL=... python -m benchmarks.run --scenario inc_dec_burst --users 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from dotenv import dotenv_values
+
+# Benchmark foydalanuvchilarni qo'shadi va o'chiradi: botning bazasida hech qachon ishlamasligi kerak
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if not BENCH_DATABASE_URL:
+    sys.exit("BENCH_DATABASE_URL berilmagan: benchmark uchun alohida baza ko'rsating")
+if BENCH_DATABASE_URL in (os.getenv("DATABASE_URL"), dotenv_values().get("DATABASE_URL")):
+    sys.exit("BENCH_DATABASE_URL botning DATABASE_URL i bilan bir xil: alohida baza ko'rsating")
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+# Benchmark aladhan ga bormasligi uchun
+os.environ.setdefault("PRAYER_TIMES_SOURCE", "local")
+
+from aiogram import Bot  # noqa: E402
+
+from benchmarks.fake_session import FakeSession  # noqa: E402
+from benchmarks.updates import message_update, callback_update, next_update_id  # noqa: E402
+from config import BOT_TOKEN, RENDER_DEBOUNCE_MS  # noqa: E402
+from database.db import init_db, close_db, get_all_faq, is_admin, get_connection  # noqa: E402
+from database.qazo_buffer import start_qazo_buffer, stop_qazo_buffer  # noqa: E402
+from main import build_dispatcher  # noqa: E402
+from utils.metrics import setup_session_metrics  # noqa: E402
+from utils.namoz_parser import init_session, close_session  # noqa: E402
+from utils.prayer_calc import build_timetable  # noqa: E402
+from utils.regions import regions  # noqa: E402
+
+BENCH_USER_ID_BASE = 9_000_000_000
+BENCH_USER_ID_LIMIT = 10_000_000
+
+
+def scenario_start(user_id: int, context: dict) -> list:
+    return [message_update(user_id, "/start")]
+
+
+def scenario_qazo_menu(user_id: int, context: dict) -> list:
+    return [callback_update(user_id, "qazo_menu")]
+
+
+def scenario_inc_dec_burst(user_id: int, context: dict) -> list:
+    prayer = random.choice(["bomdod", "peshin", "asr", "shom", "xufton", "vitr"])
+    return [callback_update(user_id, f"{'inc' if i % 3 else 'dec'}_{prayer}") for i in range(10)]
+
+
+def scenario_prayer_times(user_id: int, context: dict) -> list:
+    region = random.choice(list(regions))
+    city = random.choice(regions[region])
+    return [
+        callback_update(user_id, "namoz_vaqtlari"),
+        callback_update(user_id, f"region_{region}"),
+        callback_update(user_id, f"city_{city}_{region}"),
+    ]
+
+
+def scenario_faq(user_id: int, context: dict) -> list:
+    updates = [callback_update(user_id, "faq")]
+    if context["faq_ids"]:
+        updates.append(callback_update(user_id, f"faq_answer_{random.choice(context['faq_ids'])}"))
+        updates.append(callback_update(user_id, "back_to_faq_list"))
+    return updates
+
+
+def scenario_calculator(user_id: int, context: dict) -> list:
+    return [
+        callback_update(user_id, "qazo_hisoblash"),
+        callback_update(user_id, "range_days"),
+        message_update(user_id, "3"),
+    ]
+
+
+SCENARIOS = {
+    "start": scenario_start,
+    "qazo_menu": scenario_qazo_menu,
+    "inc_dec_burst": scenario_inc_dec_burst,
+    "prayer_times": scenario_prayer_times,
+    "faq": scenario_faq,
+    "calculator": scenario_calculator,
+}
+
+
+def _percentile(values: list, q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+async def run_scenario(dp, bot: Bot, name: str, users: list, concurrency: int, context: dict) -> dict:
+    """Har bir foydalanuvchi oqimi ketma-ket, turli foydalanuvchilar parallel ishlanadi"""
+    build = SCENARIOS[name]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def user_flow(user_id: int):
+        async with semaphore:
+            for update in build(user_id, context):
+                started = time.perf_counter()
+                await dp.feed_raw_update(bot, update)
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_flow(user_id) for user_id in users))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "updates": len(latencies),
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "updates_per_s": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+
+async def seed_bench_users(count: int) -> list:
+    """
+    Benchmark foydalanuvchilarini qo'shish; faqat haqiqatan qo'shilgan user_id lar qaytadi
+    (bazada oldindan bor foydalanuvchilar ishlatilmaydi va o'chirilmaydi).
+    next_reminder_at bo'sh qoladi - ularga eslatma yuborilmaydi.
+    """
+    pool = await get_connection()
+    async with pool.acquire(label="seed_bench_users") as conn:
+        rows = await conn.fetch("""
+                                INSERT INTO users (user_id, full_name)
+                                SELECT id, 'bench' || id
+                                FROM generate_series($1::bigint, $2::bigint) AS id
+                                ON CONFLICT (user_id) DO NOTHING
+                                RETURNING user_id
+                                """, BENCH_USER_ID_BASE, BENCH_USER_ID_BASE + count - 1)
+    return sorted(row['user_id'] for row in rows)
+
+
+async def cleanup_bench_data(user_ids: list, first_update_id: int, last_update_id: int):
+    """Shu ishga tushirishda qo'shilgan foydalanuvchilar va ularning qazo/FSM/a'zolik/dedupe qatorlarini o'chirish"""
+    pool = await get_connection()
+    async with pool.acquire(label="cleanup_bench_data") as conn:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM fsm_storage WHERE user_id = ANY ($1::bigint[])", user_ids)
+            await conn.execute("DELETE FROM channel_members WHERE user_id = ANY ($1::bigint[])", user_ids)
+            # qazo va qazo_counts users ga ON DELETE CASCADE bilan bog'langan
+            deleted = await conn.execute("DELETE FROM users WHERE user_id = ANY ($1::bigint[])", user_ids)
+            await conn.execute("""
+                               DELETE FROM processed_updates
+                               WHERE update_id BETWEEN $1 AND $2
+                               """, first_update_id, last_update_id)
+    print(f"Benchmark ma'lumotlari tozalandi: {deleted}")
+
+
+async def main(args):
+    session = FakeSession(latency=args.api_latency_ms / 1000)
+    bot = Bot(token=BOT_TOKEN, session=session)
+    setup_session_metrics(bot)
+    dp = build_dispatcher()
+
+    await init_db()
+    await init_session()
+    build_timetable()
+    start_qazo_buffer()
+
+    first_update_id = next_update_id()
+    scenarios = [args.scenario] if args.scenario else list(SCENARIOS)
+    results = []
+    inserted = []
+    try:
+        inserted = await seed_bench_users(min(args.users, BENCH_USER_ID_LIMIT))
+        users = [user_id for user_id in inserted if not await is_admin(user_id)]
+        context = {"faq_ids": [faq["id"] for faq in await get_all_faq()]}
+
+        # Keshlarni qizdirish (birinchi so'rovlar o'lchovga kirmaydi)
+        for name in scenarios:
+            await run_scenario(dp, bot, name, users[:min(len(users), 10)], args.concurrency, context)
+        for name in scenarios:
+            results.append(await run_scenario(dp, bot, name, users, args.concurrency, context))
+        # Kechiktirilgan menyu tahrirlari tugashini kutish
+        await asyncio.sleep(RENDER_DEBOUNCE_MS / 1000 + 0.2)
+    finally:
+        # Buferdagi deltalar avval yoziladi, keyin benchmark qatorlari o'chiriladi
+        await stop_qazo_buffer()
+        await cleanup_bench_data(inserted, first_update_id, next_update_id())
+        await close_session()
+        await close_db()
+
+    print(f"\n{'scenario':<16}{'updates':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'upd/s':>10}")
+    for result in results:
+        print(f"{result['scenario']:<16}{result['updates']:>9}{result['p50_ms']:>10.2f}"
+              f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['updates_per_s']:>10.0f}")
+    print(f"\nBot API chaqiruvlari: {dict(session.calls)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dispatcher benchmark (fake Bot session)")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), help="faqat bitta ssenariy")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="taqlid qilinadigan Bot API javob vaqti")
+    asyncio.run(main(parser.parse_args()))
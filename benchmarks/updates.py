@@ -0,0 +1,45 @@
+import time
+
+# Sintetik update lar (Telegram webhook JSON ko'rinishida); update_id lar takrorlanmaydi
+_update_id = int(time.time() * 1000)
+
+
+def next_update_id() -> int:
+    global _update_id
+    _update_id += 1
+    return _update_id
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"bench{user_id}"}
+
+
+def message_update(user_id: int, text: str) -> dict:
+    message = {
+        "message_id": next_update_id() % 1_000_000,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": next_update_id(), "message": message}
+
+
+def callback_update(user_id: int, data: str, message_id: int = 1) -> dict:
+    return {
+        "update_id": next_update_id(),
+        "callback_query": {
+            "id": str(next_update_id()),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "menu",
+            },
+        },
+    }
@@ -14,6 +14,58 @@ PORT = int(os.getenv("PORT", "8000"))
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 WEBHOOK_PATH = "/webhook"
 
+# Namoz vaqtlari API (aladhan) sozlamalari
+PRAYER_API_TIMEOUT = float(os.getenv("PRAYER_API_TIMEOUT", "5"))
+PRAYER_API_CONCURRENCY = int(os.getenv("PRAYER_API_CONCURRENCY", "10"))
+# "api" - aladhan (xatoda offline hisobga o'tadi), "local" - faqat offline hisob
+PRAYER_TIMES_SOURCE = os.getenv("PRAYER_TIMES_SOURCE", "api")
+# Offline hisob usuli (utils/prayer_calc.METHODS); aladhan O'zbekiston uchun tanlaydigan usulga mos
+PRAYER_CALC_METHOD = os.getenv("PRAYER_CALC_METHOD", "tehran")
+
+# qazo jadvali formati: "narrow" - har namoz alohida qator, "wide" - har foydalanuvchiga bitta qator
+QAZO_SCHEMA = os.getenv("QAZO_SCHEMA", "narrow")
+# ➕/➖ bosishlarini yig'ib yozish: har N ms da yoki kalitlar soni chegaraga yetganda
+QAZO_FLUSH_INTERVAL_MS = int(os.getenv("QAZO_FLUSH_INTERVAL_MS", "500"))
+QAZO_BUFFER_MAX_KEYS = int(os.getenv("QAZO_BUFFER_MAX_KEYS", "500"))
+# Adminlar keshi qancha vaqtda (soniya) bazadan qayta yuklanadi
+ADMIN_CACHE_TTL = float(os.getenv("ADMIN_CACHE_TTL", "30"))
+# Ommaviy xabar yuborish: Telegram ~30 xabar/s cheklovidan past tezlik va parallel yuboruvchilar soni
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+BROADCAST_MAX_ATTEMPTS = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "3"))
+# Vaqtinchalik xato bilan yetib bormaganlar uchun ro'yxat boshidan qayta o'tishlar soni
+BROADCAST_RETRY_PASSES = int(os.getenv("BROADCAST_RETRY_PASSES", "2"))
+# Yuborilganlar bazaga shu o'lchamdagi bo'laklar bilan yoziladi
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "200"))
+# Eslatmalar: vaqt tanlamagan foydalanuvchilar [boshlanish, +daqiqalar] oynasiga teng taqsimlanadi
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Asia/Tashkent")
+REMINDER_WINDOW_START = os.getenv("REMINDER_WINDOW_START", "21:00")
+REMINDER_WINDOW_MINUTES = int(os.getenv("REMINDER_WINDOW_MINUTES", "120"))
+REMINDER_BATCH_LIMIT = int(os.getenv("REMINDER_BATCH_LIMIT", "1000"))
+REMINDER_GRACE_MINUTES = int(os.getenv("REMINDER_GRACE_MINUTES", "30"))
+# Obuna tekshiruvi keshi (soniya): obuna bo'lganlar uzoqroq, obuna bo'lmaganlar qisqa vaqt saqlanadi
+SUBSCRIPTION_CACHE_TTL = float(os.getenv("SUBSCRIPTION_CACHE_TTL", "600"))
+SUBSCRIPTION_NEGATIVE_TTL = float(os.getenv("SUBSCRIPTION_NEGATIVE_TTL", "10"))
+# FAQ: bir sahifadagi savollar soni va qidiruv turi ("trgm" - pg_trgm, "fts" - tsvector)
+FAQ_PAGE_SIZE = int(os.getenv("FAQ_PAGE_SIZE", "8"))
+FAQ_SEARCH_MODE = os.getenv("FAQ_SEARCH_MODE", "trgm")
+# FSM holatlari saqlanadigan joy: "postgres", "redis" (REDIS_URL) yoki "memory"; TTL soniyada
+FSM_STORAGE = os.getenv("FSM_STORAGE", "postgres")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "86400"))
+# Webhook: "queue" - darhol javob berib update ni navbatga qo'yish, "simple" - aiogram SimpleRequestHandler
+WEBHOOK_MODE = os.getenv("WEBHOOK_MODE", "queue")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "2000"))
+# Takroriy update larni aniqlash: "memory" - faqat shu jarayon, "postgres" - replikalar orasida
+UPDATE_DEDUPE_MODE = os.getenv("UPDATE_DEDUPE_MODE", "memory")
+UPDATE_DEDUPE_SIZE = int(os.getenv("UPDATE_DEDUPE_SIZE", "10000"))
+# Event loop kechikishini o'lchash: har N ms da, chegaradan oshsa asosiy oqim steki logga yoziladi
+LOOP_LAG_INTERVAL_MS = int(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_LAG_THRESHOLD_MS = int(os.getenv("LOOP_LAG_THRESHOLD_MS", "200"))
+# Ketma-ket bosishlarda qazo menyusini qayta chizishdan oldingi kutish oynasi
+RENDER_DEBOUNCE_MS = int(os.getenv("RENDER_DEBOUNCE_MS", "300"))
+
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN .env faylida topilmadi!")
 if not ADMIN_ID:
@@ -1,9 +1,17 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, date
 import os
-from config import ADMIN_ID, DATABASE_URL
+from config import ADMIN_ID, DATABASE_URL, QAZO_SCHEMA, ADMIN_CACHE_TTL, REMINDER_WINDOW_START, \
+    REMINDER_WINDOW_MINUTES, DEFAULT_TIMEZONE, FAQ_SEARCH_MODE
 import asyncpg
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, AsyncIterator
+from zoneinfo import ZoneInfo
+
+from utils.metrics import TimedPool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +23,46 @@ logger = logging.getLogger(__name__)
 # Connection pool
 pool: Optional[asyncpg.Pool] = None
 
+QAZO_PRAYERS = ["bomdod", "peshin", "asr", "shom", "xufton", "vitr"]
+# QAZO_SCHEMA=wide bo'lsa ham qazo_counts dan faqat ko'chirish tugagach o'qiladi/yoziladi
+_qazo_wide_ready = False
+
+# Adminlar keshi: is_admin har chaqiruvda bazaga bormaydi
+_admin_ids: set = set()
+_admins_loaded_at: float = 0.0
+_admins_lock = asyncio.Lock()
+# Kam o'zgaradigan jadvallar (channels, faq) xotirada saqlanadi; yozilganda versiya oshiriladi
+# va boshqa replikalar LISTEN/NOTIFY orqali xabardor qilinadi
+REFERENCE_CHANNEL = "qazo_reference"
+_reference_cache: Dict[str, list] = {}
+_reference_versions: Dict[str, int] = {"channels": 0, "faq": 0}
+_reference_listener: Optional[asyncpg.Connection] = None
+_reference_reconnect_task: Optional[asyncio.Task] = None
+
+# FAQ qidiruvi: pg_trgm o'rnatib bo'lmasa tsvector ga o'tiladi
+FAQ_DOCUMENT_SQL = "(COALESCE(question, '') || ' ' || COALESCE(answer, ''))"
+FAQ_SEARCH_LIMIT = 10
+MAX_CACHED_SEARCHES = 1000
+_faq_search_mode = FAQ_SEARCH_MODE
+_faq_search_cache: "OrderedDict[str, list]" = OrderedDict()
+
+
+# Eslatma vaqtini tanlamaganlar shu oyna bo'ylab user_id bo'yicha teng taqsimlanadi
+_REMINDER_WINDOW_START = datetime.strptime(REMINDER_WINDOW_START, "%H:%M").strftime("%H:%M")
+_REMINDER_WINDOW_MINUTES = max(int(REMINDER_WINDOW_MINUTES), 1)
+_DEFAULT_TIMEZONE = ZoneInfo(DEFAULT_TIMEZONE).key
+
+
+def _next_reminder_sql(ref: str, alias: str = "") -> str:
+    """ref momentidan keyingi eslatma vaqti (TIMESTAMPTZ) uchun SQL ifoda"""
+    tz = f"COALESCE({alias}timezone, '{_DEFAULT_TIMEZONE}')"
+    local_time = (f"COALESCE({alias}reminder_time, TIME '{_REMINDER_WINDOW_START}'"
+                  f" + make_interval(mins => ({alias}user_id % {_REMINDER_WINDOW_MINUTES})::int))")
+    local_date = f"({ref} AT TIME ZONE {tz})::date"
+    today = f"(({local_date} + {local_time}) AT TIME ZONE {tz})"
+    tomorrow = f"(({local_date} + 1 + {local_time}) AT TIME ZONE {tz})"
+    return f"CASE WHEN {today} > {ref} THEN {today} ELSE {tomorrow} END"
+
 
 async def get_connection():
     global pool
@@ -27,14 +75,14 @@ async def init_db():
     global pool
     logger.info("PostgreSQL ma'lumotlar bazasi ishga tushirilmoqda")
     try:
-        pool = await asyncpg.create_pool(
+        pool = TimedPool(await asyncpg.create_pool(
             DATABASE_URL,
             min_size=1,
             max_size=10,
             command_timeout=60
-        )
+        ))
 
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="init_db") as conn:
             await conn.execute("""
                                CREATE TABLE IF NOT EXISTS users
                                (
@@ -90,6 +138,17 @@ async def init_db():
                                    KEY
                                )
                                """)
+            # chat_member yangilanishlaridan to'ldiriladigan kanal a'zoligi jadvali
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS channel_members
+                               (
+                                   channel_id TEXT REFERENCES channels (channel_id) ON DELETE CASCADE,
+                                   user_id    BIGINT,
+                                   status     TEXT,
+                                   updated_at TIMESTAMP DEFAULT NOW(),
+                                   PRIMARY KEY (channel_id, user_id)
+                               )
+                               """)
             await conn.execute("""
                                CREATE TABLE IF NOT EXISTS faq
                                (
@@ -105,7 +164,130 @@ async def init_db():
                                    TEXT
                                )
                                """)
+            # Har bir foydalanuvchining eslatma vaqti va keyingi eslatma momenti
+            await conn.execute("""
+                               ALTER TABLE users
+                                   ADD COLUMN IF NOT EXISTS reminder_time TIME,
+                                   ADD COLUMN IF NOT EXISTS timezone TEXT,
+                                   ADD COLUMN IF NOT EXISTS next_reminder_at TIMESTAMPTZ
+                               """)
+            await conn.execute("""
+                               CREATE INDEX IF NOT EXISTS users_next_reminder_at_idx
+                                   ON users (next_reminder_at)
+                               """)
+            await conn.execute(f"""
+                               UPDATE users
+                               SET next_reminder_at = {_next_reminder_sql("NOW()")}
+                               WHERE next_reminder_at IS NULL
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS qazo_counts
+                               (
+                                   user_id BIGINT PRIMARY KEY REFERENCES users (user_id) ON DELETE CASCADE,
+                                   bomdod  INTEGER NOT NULL DEFAULT 0,
+                                   peshin  INTEGER NOT NULL DEFAULT 0,
+                                   asr     INTEGER NOT NULL DEFAULT 0,
+                                   shom    INTEGER NOT NULL DEFAULT 0,
+                                   xufton  INTEGER NOT NULL DEFAULT 0,
+                                   vitr    INTEGER NOT NULL DEFAULT 0
+                               )
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS schema_migrations
+                               (
+                                   name       TEXT PRIMARY KEY,
+                                   applied_at TIMESTAMP DEFAULT NOW()
+                               )
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS broadcast_jobs
+                               (
+                                   id                  SERIAL PRIMARY KEY,
+                                   admin_id            BIGINT,
+                                   text                TEXT,
+                                   status              TEXT      DEFAULT 'running',
+                                   cursor_user_id      BIGINT    DEFAULT 0,
+                                   sent                INTEGER   DEFAULT 0,
+                                   blocked             INTEGER   DEFAULT 0,
+                                   not_found           INTEGER   DEFAULT 0,
+                                   failed              INTEGER   DEFAULT 0,
+                                   progress_chat_id    BIGINT,
+                                   progress_message_id BIGINT,
+                                   owner               TEXT,
+                                   lease_until         TIMESTAMP,
+                                   retry_passes        INTEGER   DEFAULT 0,
+                                   created_at          TIMESTAMP DEFAULT NOW(),
+                                   updated_at          TIMESTAMP DEFAULT NOW()
+                               )
+                               """)
+            await conn.execute("""
+                               ALTER TABLE broadcast_jobs
+                                   ADD COLUMN IF NOT EXISTS retry_passes INTEGER DEFAULT 0
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS broadcast_deliveries
+                               (
+                                   job_id       INTEGER REFERENCES broadcast_jobs (id) ON DELETE CASCADE,
+                                   user_id      BIGINT,
+                                   status       TEXT,
+                                   delivered_at TIMESTAMP DEFAULT NOW(),
+                                   PRIMARY KEY (job_id, user_id)
+                               )
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS fsm_storage
+                               (
+                                   bot_id     BIGINT,
+                                   chat_id    BIGINT,
+                                   user_id    BIGINT,
+                                   thread_id  BIGINT DEFAULT 0,
+                                   destiny    TEXT,
+                                   state      TEXT,
+                                   data       JSONB  DEFAULT '{}',
+                                   expires_at TIMESTAMPTZ,
+                                   PRIMARY KEY (bot_id, chat_id, user_id, thread_id, destiny)
+                               )
+                               """)
+            await conn.execute("""
+                               CREATE INDEX IF NOT EXISTS fsm_storage_expires_at_idx
+                                   ON fsm_storage (expires_at)
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS processed_updates
+                               (
+                                   update_id  BIGINT PRIMARY KEY,
+                                   created_at TIMESTAMP DEFAULT NOW()
+                               )
+                               """)
+            await conn.execute("""
+                               CREATE TABLE IF NOT EXISTS prayer_times
+                               (
+                                   city    TEXT,
+                                   date    DATE,
+                                   fajr    TIME,
+                                   sunrise TIME,
+                                   dhuhr   TIME,
+                                   asr     TIME,
+                                   maghrib TIME,
+                                   isha    TIME,
+                                   source  TEXT NOT NULL DEFAULT 'local',
+                                   PRIMARY KEY (city, date)
+                               )
+                               """)
+            # 'api' - aladhan javobi, 'local' - offline hisob (keyingi ishga tushishda API qayta so'raladi)
+            await conn.execute("""
+                               ALTER TABLE prayer_times
+                                   ADD COLUMN IF NOT EXISTS source TEXT NOT NULL DEFAULT 'local'
+                               """)
         logger.info("PostgreSQL ma'lumotlar bazasi yaratildi")
+
+        await init_faq_search()
+
+        if QAZO_SCHEMA == "wide":
+            await migrate_qazo_to_wide()
+
+        await load_admins()
+        await start_reference_listener()
     except Exception as e:
         logger.error(f"init_db xatoligi: {e}")
         raise
@@ -114,7 +296,7 @@ async def init_db():
 async def user_exists(user_id: int) -> bool:
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="user_exists") as conn:
             result = await conn.fetchval("SELECT 1 FROM users WHERE user_id = $1", user_id)
             return result is not None
     except Exception as e:
@@ -127,37 +309,57 @@ async def add_user(user_id: int, full_name: str):
         return
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="add_user") as conn:
             await conn.execute("""
                                INSERT INTO users (user_id, full_name, created_at)
                                VALUES ($1, $2, $3)
                                """, user_id, full_name, datetime.now())
+            await conn.execute(f"""
+                               UPDATE users
+                               SET next_reminder_at = {_next_reminder_sql("NOW()")}
+                               WHERE user_id = $1
+                               """, user_id)
             logger.info(f"Foydalanuvchi qo'shildi: {user_id}")
     except Exception as e:
         logger.error(f"add_user xato: {e}")
 
 
-async def is_admin(user_id: int) -> bool:
+async def load_admins():
+    """Adminlar ro'yxatini bazadan xotiraga yuklash"""
+    global _admin_ids, _admins_loaded_at
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
-            result = await conn.fetchrow("SELECT is_admin, is_main_admin FROM users WHERE user_id = $1", user_id)
-            if result:
-                return result['is_admin'] or result['is_main_admin'] or user_id == ADMIN_ID
-            return user_id == ADMIN_ID
+        async with pool.acquire(label="load_admins") as conn:
+            rows = await conn.fetch("SELECT user_id FROM users WHERE is_admin = TRUE OR is_main_admin = TRUE")
+            _admin_ids = {row['user_id'] for row in rows}
+            _admins_loaded_at = time.monotonic()
     except Exception as e:
-        logger.error(f"is_admin xato: {e}")
-        return False
+        # Baza ishlamasa eski ro'yxat bilan keyingi TTL gacha davom etamiz
+        _admins_loaded_at = time.monotonic()
+        logger.error(f"load_admins xato: {e}")
+
+
+async def is_admin(user_id: int) -> bool:
+    if user_id == ADMIN_ID:
+        return True
+    # Boshqa replikalardagi o'zgarishlar qisqa TTL bilan yangilanadi
+    if time.monotonic() - _admins_loaded_at > ADMIN_CACHE_TTL:
+        async with _admins_lock:
+            if time.monotonic() - _admins_loaded_at > ADMIN_CACHE_TTL:
+                await load_admins()
+    return user_id in _admin_ids
 
 
 async def add_admin(user_id: int) -> bool:
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="add_admin") as conn:
             if user_id == ADMIN_ID:
-                await conn.execute("UPDATE users SET is_main_admin = TRUE WHERE user_id = $1", user_id)
+                result = await conn.execute("UPDATE users SET is_main_admin = TRUE WHERE user_id = $1", user_id)
             else:
-                await conn.execute("UPDATE users SET is_admin = TRUE WHERE user_id = $1", user_id)
+                result = await conn.execute("UPDATE users SET is_admin = TRUE WHERE user_id = $1", user_id)
+            if result != "UPDATE 0":
+                _admin_ids.add(user_id)
             logger.info(f"Admin qo'shildi: {user_id}")
             return True
     except Exception as e:
@@ -170,9 +372,10 @@ async def remove_admin(user_id: int) -> bool:
         return False
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="remove_admin") as conn:
             result = await conn.execute("UPDATE users SET is_admin = FALSE, is_main_admin = FALSE WHERE user_id = $1",
                                         user_id)
+            _admin_ids.discard(user_id)
             return result != "UPDATE 0"
     except Exception as e:
         logger.error(f"remove_admin xato: {e}")
@@ -182,7 +385,7 @@ async def remove_admin(user_id: int) -> bool:
 async def get_all_admins():
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="get_all_admins") as conn:
             rows = await conn.fetch("SELECT user_id FROM users WHERE is_admin = TRUE OR is_main_admin = TRUE")
             admins = [row['user_id'] for row in rows]
             if ADMIN_ID and ADMIN_ID not in admins:
@@ -196,7 +399,7 @@ async def get_all_admins():
 async def get_all_users():
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="get_all_users") as conn:
             rows = await conn.fetch("SELECT user_id FROM users")
             return [{"user_id": row['user_id']} for row in rows]
     except Exception as e:
@@ -212,7 +415,7 @@ async def get_stats():
         month_ago = now - timedelta(days=30)
 
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="get_stats") as conn:
             total = await conn.fetchval("SELECT COUNT(*) FROM users")
             daily = await conn.fetchval("SELECT COUNT(*) FROM users WHERE created_at >= $1", today)
             weekly = await conn.fetchval("SELECT COUNT(*) FROM users WHERE created_at >= $1", week_ago)
@@ -224,11 +427,272 @@ async def get_stats():
         return {"total": 0, "daily": 0, "weekly": 0, "monthly": 0}
 
 
+BROADCAST_JOB_COLUMNS = """id, admin_id, text, status, cursor_user_id, sent, blocked, not_found, failed,
+                           progress_chat_id, progress_message_id, retry_passes, created_at"""
+
+
+async def create_broadcast_job(admin_id: int, text: str, progress_chat_id: int,
+                               progress_message_id: int) -> Optional[int]:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="create_broadcast_job") as conn:
+            return await conn.fetchval("""
+                                       INSERT INTO broadcast_jobs (admin_id, text, progress_chat_id, progress_message_id)
+                                       VALUES ($1, $2, $3, $4) RETURNING id
+                                       """, admin_id, text, progress_chat_id, progress_message_id)
+    except Exception as e:
+        logger.error(f"create_broadcast_job xato: {e}")
+        return None
+
+
+async def get_broadcast_job(job_id: int) -> Optional[dict]:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_broadcast_job") as conn:
+            row = await conn.fetchrow(f"SELECT {BROADCAST_JOB_COLUMNS} FROM broadcast_jobs WHERE id = $1", job_id)
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"get_broadcast_job xato: {e}")
+        return None
+
+
+async def get_broadcast_jobs(statuses: List[str]) -> List[dict]:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_broadcast_jobs") as conn:
+            rows = await conn.fetch(f"""
+                                    SELECT {BROADCAST_JOB_COLUMNS}
+                                    FROM broadcast_jobs
+                                    WHERE status = ANY ($1::text[])
+                                    ORDER BY id
+                                    """, statuses)
+            return [dict(row) for row in rows]
+    except Exception as e:
+        logger.error(f"get_broadcast_jobs xato: {e}")
+        return []
+
+
+async def set_broadcast_job_status(job_id: int, status: str, from_statuses: List[str]) -> bool:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="set_broadcast_job_status") as conn:
+            result = await conn.execute("""
+                                        UPDATE broadcast_jobs
+                                        SET status     = $2,
+                                            updated_at = NOW()
+                                        WHERE id = $1
+                                          AND status = ANY ($3::text[])
+                                        """, job_id, status, from_statuses)
+            return result != "UPDATE 0"
+    except Exception as e:
+        logger.error(f"set_broadcast_job_status xato: {e}")
+        return False
+
+
+async def claim_broadcast_job(job_id: int, owner: str, lease_seconds: int) -> bool:
+    """Ishni shu jarayonga band qilish, boshqa replika uni parallel yubormasligi uchun"""
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="claim_broadcast_job") as conn:
+            result = await conn.fetchval("""
+                                         UPDATE broadcast_jobs
+                                         SET owner       = $2,
+                                             lease_until = NOW() + make_interval(secs => $3)
+                                         WHERE id = $1
+                                           AND status = 'running'
+                                           AND (lease_until IS NULL OR lease_until < NOW() OR owner = $2)
+                                         RETURNING id
+                                         """, job_id, owner, lease_seconds)
+            return result is not None
+    except Exception as e:
+        logger.error(f"claim_broadcast_job xato: {e}")
+        return False
+
+
+async def get_broadcast_batch(job_id: int, after_user_id: int, limit: int) -> List[int]:
+    """
+    Keyingi qabul qiluvchilar: user_id bo'yicha keyset, natijasi yozilganlar tashlab ketiladi.
+    Vaqtinchalik xatolar (oxirgi o'tishgacha) yozilmaydi, shuning uchun qayta o'tishda ular yana chiqadi.
+    """
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_broadcast_batch") as conn:
+            rows = await conn.fetch("""
+                                    SELECT u.user_id
+                                    FROM users u
+                                    WHERE u.user_id > $2
+                                      AND NOT EXISTS (SELECT 1
+                                                      FROM broadcast_deliveries d
+                                                      WHERE d.job_id = $1
+                                                        AND d.user_id = u.user_id)
+                                    ORDER BY u.user_id LIMIT $3
+                                    """, job_id, after_user_id, limit)
+            return [row['user_id'] for row in rows]
+    except Exception as e:
+        logger.error(f"get_broadcast_batch xato: {e}")
+        return []
+
+
+async def restart_broadcast_pass(job_id: int, max_passes: int) -> bool:
+    """Kursorni boshiga qaytarib, yetib bormaganlarga qayta o'tishni boshlash; o'tishlar tugagan bo'lsa False"""
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="restart_broadcast_pass") as conn:
+            result = await conn.fetchval("""
+                                         UPDATE broadcast_jobs
+                                         SET cursor_user_id = 0,
+                                             retry_passes   = retry_passes + 1,
+                                             updated_at     = NOW()
+                                         WHERE id = $1
+                                           AND status = 'running'
+                                           AND retry_passes < $2
+                                         RETURNING id
+                                         """, job_id, max_passes)
+            return result is not None
+    except Exception as e:
+        logger.error(f"restart_broadcast_pass xato: {e}")
+        return False
+
+
+async def record_broadcast_batch(job_id: int, cursor_user_id: int, results: List[tuple]) -> bool:
+    """
+    Bo'lak natijalarini (user_id, status) COPY bilan yozish va kursorni surish - bitta tranzaksiyada.
+    Yozilmasa False qaytadi: chaqiruvchi ishni to'xtatishi kerak, aks holda bo'lak qayta yuboriladi.
+    """
+    counters = {"sent": 0, "blocked": 0, "not_found": 0, "failed": 0}
+    for _, status in results:
+        counters[status if status in counters else "failed"] += 1
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="record_broadcast_batch") as conn:
+            async with conn.transaction():
+                if results:
+                    await conn.copy_records_to_table(
+                        "broadcast_deliveries",
+                        records=[(job_id, user_id, status) for user_id, status in results],
+                        columns=["job_id", "user_id", "status"]
+                    )
+                await conn.execute("""
+                                   UPDATE broadcast_jobs
+                                   SET cursor_user_id = $2,
+                                       sent           = sent + $3,
+                                       blocked        = blocked + $4,
+                                       not_found      = not_found + $5,
+                                       failed         = failed + $6,
+                                       updated_at     = NOW()
+                                   WHERE id = $1
+                                   """, job_id, cursor_user_id, counters["sent"], counters["blocked"],
+                                   counters["not_found"], counters["failed"])
+        return True
+    except Exception as e:
+        logger.error(f"record_broadcast_batch xato: {e}")
+        return False
+
+
+def invalidate_reference(name: str):
+    """Jadval keshini tashlab yuborish va versiyasini oshirish"""
+    _reference_versions[name] = _reference_versions.get(name, 0) + 1
+    _reference_cache.pop(name, None)
+    if name == "faq":
+        _reference_cache.pop("faq_by_id", None)
+        _faq_search_cache.clear()
+
+
+def get_reference_version(name: str) -> int:
+    return _reference_versions.get(name, 0)
+
+
+def get_channels_version() -> int:
+    return get_reference_version("channels")
+
+
+async def _notify_reference(conn, name: str):
+    """Shu jarayonda keshni tozalash va boshqa replikalarga xabar berish"""
+    invalidate_reference(name)
+    try:
+        await conn.execute("SELECT pg_notify($1, $2)", REFERENCE_CHANNEL, name)
+    except Exception as e:
+        logger.error(f"_notify_reference xato: {e}")
+
+
+def _on_reference_notify(conn, pid, channel, payload):
+    if payload in _reference_versions:
+        invalidate_reference(payload)
+        logger.info(f"Kesh boshqa replikadan yangilandi: {payload}")
+
+
+def _on_listener_lost(conn):
+    global _reference_listener, _reference_reconnect_task
+    _reference_listener = None
+    # Xabarlar o'tkazib yuborilgan bo'lishi mumkin: keshni tozalab, qayta ulanamiz
+    for name in list(_reference_versions):
+        invalidate_reference(name)
+    logger.warning("Kesh LISTEN ulanishi uzildi, qayta ulanadi")
+    if _reference_reconnect_task is None or _reference_reconnect_task.done():
+        # Havola saqlanadi (GC yig'ib yubormasligi uchun); stop_reference_listener bekor qiladi
+        _reference_reconnect_task = asyncio.get_running_loop().create_task(_reconnect_reference_listener())
+
+
+async def _reconnect_reference_listener():
+    while pool is not None and not pool.is_closing() and _reference_listener is None:
+        await start_reference_listener()
+        if _reference_listener is None:
+            await asyncio.sleep(5)
+        else:
+            # Uzilish paytida kelgan o'zgarishlar o'tkazib yuborilgan bo'lishi mumkin
+            for name in list(_reference_versions):
+                invalidate_reference(name)
+
+
+async def start_reference_listener():
+    """Boshqa replikalarning channels/faq o'zgarishlarini tinglash uchun alohida ulanish"""
+    global _reference_listener
+    if _reference_listener is not None:
+        return
+    try:
+        conn = await asyncpg.connect(DATABASE_URL)
+        await conn.add_listener(REFERENCE_CHANNEL, _on_reference_notify)
+        conn.add_termination_listener(_on_listener_lost)
+        _reference_listener = conn
+        logger.info("Kesh LISTEN ulanishi ochildi")
+    except Exception as e:
+        logger.error(f"start_reference_listener xato: {e}")
+
+
+async def stop_reference_listener():
+    global _reference_listener, _reference_reconnect_task
+    task, _reference_reconnect_task = _reference_reconnect_task, None
+    if task is not None and not task.done():
+        task.cancel()
+    conn, _reference_listener = _reference_listener, None
+    if conn is not None:
+        conn.remove_termination_listener(_on_listener_lost)
+        await conn.close()
+
+
+async def _load_reference(name: str, query: str, build) -> list:
+    """Keshdan qaytarish; bo'lmasa bazadan yuklab, versiya o'zgarmagan bo'lsa saqlash"""
+    cached = _reference_cache.get(name)
+    if cached is not None:
+        return list(cached)
+    version = _reference_versions[name]
+    pool = await get_connection()
+    async with pool.acquire(label="_load_reference") as conn:
+        rows = await conn.fetch(query)
+    items = [build(row) for row in rows]
+    if _reference_versions[name] == version:
+        _reference_cache[name] = items
+    return list(items)
+
+
 async def add_channel(channel_id: str):
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
-            await conn.execute("INSERT INTO channels (channel_id) VALUES ($1) ON CONFLICT DO NOTHING", channel_id)
+        async with pool.acquire(label="add_channel") as conn:
+            result = await conn.execute("INSERT INTO channels (channel_id) VALUES ($1) ON CONFLICT DO NOTHING",
+                                        channel_id)
+            if result != "INSERT 0 0":
+                await _notify_reference(conn, "channels")
     except Exception as e:
         logger.error(f"add_channel xato: {e}")
 
@@ -236,9 +700,12 @@ async def add_channel(channel_id: str):
 async def remove_channel(channel_id: str):
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="remove_channel") as conn:
             result = await conn.execute("DELETE FROM channels WHERE channel_id = $1", channel_id)
-            return result != "DELETE 0"
+            if result != "DELETE 0":
+                await _notify_reference(conn, "channels")
+                return True
+            return False
     except Exception as e:
         logger.error(f"remove_channel xato: {e}")
         return False
@@ -246,65 +713,541 @@ async def remove_channel(channel_id: str):
 
 async def get_all_channels():
     try:
-        pool = await get_connection()
-        async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT channel_id FROM channels")
-            return [row['channel_id'] for row in rows]
+        return await _load_reference("channels", "SELECT channel_id FROM channels", lambda row: row['channel_id'])
     except Exception as e:
         logger.error(f"get_all_channels xato: {e}")
         return []
 
 
+async def set_channel_members(rows: list):
+    """(channel_id, user_id, status) qatorlarini channel_members jadvaliga yozish"""
+    if not rows:
+        return
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="set_channel_members") as conn:
+            await conn.execute("""
+                               INSERT INTO channel_members (channel_id, user_id, status)
+                               SELECT r.channel_id, r.user_id, r.status
+                               FROM unnest($1::text[], $2::bigint[], $3::text[]) AS r(channel_id, user_id, status)
+                                        JOIN channels c ON c.channel_id = r.channel_id
+                               ON CONFLICT (channel_id, user_id) DO UPDATE
+                                   SET status = EXCLUDED.status, updated_at = NOW()
+                               """, [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows])
+    except Exception as e:
+        logger.error(f"set_channel_members xato: {e}")
+
+
+async def get_channel_memberships(user_id: int, channels: list) -> Dict[str, str]:
+    """Foydalanuvchining berilgan kanallardagi ma'lum holatlari: {channel_id: status}"""
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_channel_memberships") as conn:
+            rows = await conn.fetch("""
+                                    SELECT channel_id, status
+                                    FROM channel_members
+                                    WHERE channel_id = ANY ($2::text[])
+                                      AND user_id = $1
+                                    """, user_id, list(channels))
+            return {row['channel_id']: row['status'] for row in rows}
+    except Exception as e:
+        logger.error(f"get_channel_memberships xato: {e}")
+        return {}
+
+
 async def add_faq(question: str, answer: str, video_url: str = None):
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="add_faq") as conn:
             await conn.execute("""
                                INSERT INTO faq (question, answer, video_url)
                                VALUES ($1, $2, $3)
                                """, question, answer, video_url)
+            await _notify_reference(conn, "faq")
     except Exception as e:
         logger.error(f"add_faq xato: {e}")
 
 
 async def get_all_faq():
     try:
-        pool = await get_connection()
-        async with pool.acquire() as conn:
-            rows = await conn.fetch("SELECT id, question, answer, video_url FROM faq")
-            return [
-                {"id": row['id'], "question": row['question'], "answer": row['answer'], "video_url": row['video_url']}
-                for row in rows]
+        return await _load_reference("faq", "SELECT id, question, answer, video_url FROM faq ORDER BY id", dict)
     except Exception as e:
         logger.error(f"get_all_faq xato: {e}")
         return []
 
 
+async def init_faq_search():
+    """FAQ qidiruvi uchun GIN indeks; pg_trgm kengaytmasiga ruxsat bo'lmasa tsvector ishlatiladi"""
+    global _faq_search_mode
+    pool = await get_connection()
+    async with pool.acquire(label="init_faq_search") as conn:
+        if _faq_search_mode == "trgm":
+            try:
+                await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                await conn.execute(f"""
+                                   CREATE INDEX IF NOT EXISTS faq_document_trgm_idx
+                                       ON faq USING GIN ({FAQ_DOCUMENT_SQL} gin_trgm_ops)
+                                   """)
+                return
+            except Exception as e:
+                logger.warning(f"pg_trgm ishlatib bo'lmadi, tsvector qidiruviga o'tiladi: {e}")
+                _faq_search_mode = "fts"
+        await conn.execute(f"""
+                           CREATE INDEX IF NOT EXISTS faq_document_fts_idx
+                               ON faq USING GIN (to_tsvector('simple', {FAQ_DOCUMENT_SQL}))
+                           """)
+
+
+async def get_faq_page(cursor_id: int = 0, limit: int = 8, backward: bool = False) -> tuple:
+    """
+    Keyset sahifalash: id > cursor_id (oldinga) yoki id < cursor_id (orqaga).
+    (savollar, oldingi sahifa bormi, keyingi sahifa bormi) qaytariladi.
+    """
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_faq_page") as conn:
+            if backward:
+                rows = await conn.fetch("""
+                                        SELECT id, question
+                                        FROM faq
+                                        WHERE id < $1
+                                        ORDER BY id DESC
+                                        LIMIT $2
+                                        """, cursor_id, limit + 1)
+                has_prev = len(rows) > limit
+                rows = list(reversed(rows[:limit]))
+                has_next = True
+            else:
+                rows = await conn.fetch("""
+                                        SELECT id, question
+                                        FROM faq
+                                        WHERE id > $1
+                                        ORDER BY id
+                                        LIMIT $2
+                                        """, cursor_id, limit + 1)
+                has_next = len(rows) > limit
+                rows = rows[:limit]
+                has_prev = bool(rows) and await conn.fetchval("SELECT EXISTS(SELECT 1 FROM faq WHERE id < $1)",
+                                                              rows[0]['id'])
+            return [dict(row) for row in rows], has_prev, has_next
+    except Exception as e:
+        logger.error(f"get_faq_page xato: {e}")
+        return [], False, False
+
+
+def normalize_faq_query(query: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+async def search_faq(query: str, limit: int = FAQ_SEARCH_LIMIT) -> list:
+    """Savol/javob matni bo'yicha qidirish; natijalar normallashtirilgan so'rov bo'yicha keshlanadi"""
+    query = normalize_faq_query(query)
+    if not query:
+        return []
+    cached = _faq_search_cache.get(query)
+    if cached is not None:
+        _faq_search_cache.move_to_end(query)
+        return list(cached)
+
+    version = get_reference_version("faq")
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="search_faq") as conn:
+            if _faq_search_mode == "trgm":
+                rows = await conn.fetch(f"""
+                                        SELECT id, question
+                                        FROM faq
+                                        WHERE $1 <% {FAQ_DOCUMENT_SQL}
+                                        ORDER BY word_similarity($1, {FAQ_DOCUMENT_SQL}) DESC, id
+                                        LIMIT $2
+                                        """, query, limit)
+            else:
+                rows = await conn.fetch(f"""
+                                        SELECT id, question
+                                        FROM faq
+                                        WHERE to_tsvector('simple', {FAQ_DOCUMENT_SQL})
+                                                  @@ plainto_tsquery('simple', $1)
+                                        ORDER BY ts_rank(to_tsvector('simple', {FAQ_DOCUMENT_SQL}),
+                                                         plainto_tsquery('simple', $1)) DESC, id
+                                        LIMIT $2
+                                        """, query, limit)
+    except Exception as e:
+        logger.error(f"search_faq xato: {e}")
+        return []
+
+    results = [dict(row) for row in rows]
+    if get_reference_version("faq") == version:
+        _faq_search_cache[query] = results
+        while len(_faq_search_cache) > MAX_CACHED_SEARCHES:
+            _faq_search_cache.popitem(last=False)
+    return list(results)
+
+
+async def get_faq(faq_id: int) -> Optional[dict]:
+    """Bitta savolni id bo'yicha olish (keshdagi id -> savol xaritasidan)"""
+    version = get_reference_version("faq")
+    index = _reference_cache.get("faq_by_id")
+    if index is None:
+        index = {faq["id"]: faq for faq in await get_all_faq()}
+        if get_reference_version("faq") == version and "faq" in _reference_cache:
+            _reference_cache["faq_by_id"] = index
+    return index.get(faq_id)
+
+
+def _wide_column(prayer: str) -> str:
+    # Ustun nomi SQL ichiga qo'yiladi, shuning uchun faqat ma'lum namozlar qabul qilinadi
+    if prayer not in QAZO_PRAYERS:
+        raise ValueError(f"Noma'lum namoz: {prayer}")
+    return prayer
+
+
+def _qazo_wide() -> bool:
+    return QAZO_SCHEMA == "wide" and _qazo_wide_ready
+
+
+async def _install_qazo_mirror_trigger(conn):
+    """
+    qazo ga har qanday yozuv (eski, narrow rejimdagi replikalardan ham) qazo_counts ga delta sifatida
+    takrorlanadi: rolling deploy paytida ko'chirishdan keyingi o'zgarishlar yo'qolmaydi.
+    """
+    prayers = ", ".join(f"'{prayer}'" for prayer in QAZO_PRAYERS)
+    await conn.execute(f"""
+                       CREATE OR REPLACE FUNCTION qazo_mirror_to_wide() RETURNS trigger AS $$
+                       DECLARE
+                           delta INTEGER;
+                       BEGIN
+                           IF TG_OP = 'DELETE' THEN
+                               IF OLD.prayer_name IN ({prayers}) AND COALESCE(OLD.count, 0) <> 0 THEN
+                                   -- Foydalanuvchi o'chirilganda qazo_counts qatori CASCADE bilan ketadi
+                                   EXECUTE format('UPDATE qazo_counts SET %1$I = GREATEST(%1$I - $2, 0)
+                                                   WHERE user_id = $1', OLD.prayer_name)
+                                       USING OLD.user_id, OLD.count;
+                               END IF;
+                               RETURN NULL;
+                           END IF;
+                           IF NEW.prayer_name NOT IN ({prayers}) THEN
+                               RETURN NULL;
+                           END IF;
+                           IF TG_OP = 'INSERT' THEN
+                               delta := COALESCE(NEW.count, 0);
+                           ELSE
+                               delta := COALESCE(NEW.count, 0) - COALESCE(OLD.count, 0);
+                           END IF;
+                           IF delta <> 0 THEN
+                               EXECUTE format('INSERT INTO qazo_counts (user_id, %1$I) VALUES ($1, GREATEST($2, 0))
+                                               ON CONFLICT (user_id)
+                                               DO UPDATE SET %1$I = GREATEST(qazo_counts.%1$I + $2, 0)',
+                                              NEW.prayer_name)
+                                   USING NEW.user_id, delta;
+                           END IF;
+                           RETURN NULL;
+                       END
+                       $$ LANGUAGE plpgsql
+                       """)
+    await conn.execute("""
+                       DO $$
+                       BEGIN
+                           IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'qazo_mirror_to_wide') THEN
+                               CREATE TRIGGER qazo_mirror_to_wide
+                                   AFTER INSERT OR UPDATE OR DELETE ON qazo
+                                   FOR EACH ROW EXECUTE PROCEDURE qazo_mirror_to_wide();
+                           END IF;
+                       END
+                       $$
+                       """)
+
+
+async def migrate_qazo_to_wide(batch_size: int = 1000) -> int:
+    """
+    qazo (user_id, prayer_name, count) qatorlarini qazo_counts ga bo'laklab ko'chirish.
+    Avval trigger o'rnatiladi, keyin mavjud qatorlar backfill qilinadi; qazo_counts dan o'qish
+    faqat backfill tugagach (schema_migrations da 'qazo_wide' belgisi bo'lsa) yoqiladi.
+    """
+    global _qazo_wide_ready
+    pool = await get_connection()
+    async with pool.acquire(label="migrate_qazo_to_wide") as conn:
+        await _install_qazo_mirror_trigger(conn)
+        done = await conn.fetchval("SELECT 1 FROM schema_migrations WHERE name = 'qazo_wide'")
+    if done:
+        _qazo_wide_ready = True
+        return 0
+
+    pivot = ",\n".join(
+        f"COALESCE(MAX(count) FILTER (WHERE prayer_name = '{prayer}'), 0)" for prayer in QAZO_PRAYERS
+    )
+    updates = ", ".join(f"{prayer} = EXCLUDED.{prayer}" for prayer in QAZO_PRAYERS)
+    last_user_id = -1
+    migrated = 0
+    while True:
+        # Har bir bo'lak alohida tranzaksiyada: eski jadval to'liq qulflanmaydi, bot ishlashda davom etadi
+        async with pool.acquire(label="migrate_qazo_to_wide") as conn:
+            async with conn.transaction():
+                user_ids = await conn.fetch("""
+                                            SELECT DISTINCT user_id
+                                            FROM qazo
+                                            WHERE user_id > $1
+                                            ORDER BY user_id LIMIT $2
+                                            """, last_user_id, batch_size)
+                if not user_ids:
+                    break
+                ids = [row['user_id'] for row in user_ids]
+                # Bo'lak qatorlari qulflanadi: parallel yozuv backfill tugashini kutadi va uning
+                # trigger deltasi ko'chirilgan qiymat ustiga qo'shiladi (aks holda eski qiymat ustidan yozilardi)
+                await conn.execute("""
+                                   SELECT 1
+                                   FROM qazo
+                                   WHERE user_id = ANY ($1::bigint[])
+                                   ORDER BY user_id, prayer_name
+                                   FOR UPDATE
+                                   """, ids)
+                await conn.execute(f"""
+                                   INSERT INTO qazo_counts (user_id, {", ".join(QAZO_PRAYERS)})
+                                   SELECT q.user_id, {pivot}
+                                   FROM qazo q
+                                   WHERE q.user_id = ANY ($1::bigint[])
+                                   GROUP BY q.user_id
+                                   ON CONFLICT (user_id) DO UPDATE SET {updates}
+                                   """, ids)
+                last_user_id = ids[-1]
+                migrated += len(ids)
+
+    async with pool.acquire(label="migrate_qazo_to_wide") as conn:
+        await conn.execute("INSERT INTO schema_migrations (name) VALUES ('qazo_wide') ON CONFLICT DO NOTHING")
+    _qazo_wide_ready = True
+    logger.info(f"qazo jadvali keng formatga ko'chirildi: {migrated} foydalanuvchi")
+    return migrated
+
+
 async def get_user_qazo(user_id: int) -> dict:
-    prayers = ["bomdod", "peshin", "asr", "shom", "xufton", "vitr"]
-    qazo_counts = {prayer: 0 for prayer in prayers}
-    try:
-        pool = await get_connection()
-        async with pool.acquire() as conn:
-            for prayer in prayers:
-                result = await conn.fetchval("""
-                                             SELECT count
-                                             FROM qazo
-                                             WHERE user_id = $1
-                                               AND prayer_name = $2
-                                             """, user_id, prayer)
-                if result:
-                    qazo_counts[prayer] = result
+    qazo_counts = {prayer: 0 for prayer in QAZO_PRAYERS}
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_user_qazo") as conn:
+            if _qazo_wide():
+                row = await conn.fetchrow(f"""
+                                          SELECT {", ".join(QAZO_PRAYERS)}
+                                          FROM qazo_counts
+                                          WHERE user_id = $1
+                                          """, user_id)
+                if row:
+                    qazo_counts.update(dict(row))
+                return qazo_counts
+            rows = await conn.fetch("""
+                                    SELECT prayer_name, count
+                                    FROM qazo
+                                    WHERE user_id = $1
+                                    """, user_id)
+            for row in rows:
+                if row['prayer_name'] in qazo_counts and row['count']:
+                    qazo_counts[row['prayer_name']] = row['count']
         return qazo_counts
     except Exception as e:
         logger.error(f"get_user_qazo xato: {e}")
         return qazo_counts
 
 
+async def get_users_qazo(user_ids: List[int]) -> Dict[int, dict]:
+    """Ko'p foydalanuvchilarning qazo sonlarini bitta so'rovda olish"""
+    result = {user_id: {prayer: 0 for prayer in QAZO_PRAYERS} for user_id in user_ids}
+    if not user_ids:
+        return result
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_users_qazo") as conn:
+            if _qazo_wide():
+                rows = await conn.fetch(f"""
+                                        SELECT user_id, {", ".join(QAZO_PRAYERS)}
+                                        FROM qazo_counts
+                                        WHERE user_id = ANY ($1::bigint[])
+                                        """, list(user_ids))
+                for row in rows:
+                    result[row['user_id']] = {prayer: row[prayer] for prayer in QAZO_PRAYERS}
+                return result
+            rows = await conn.fetch("""
+                                    SELECT user_id, prayer_name, count
+                                    FROM qazo
+                                    WHERE user_id = ANY ($1::bigint[])
+                                    """, list(user_ids))
+            for row in rows:
+                counts = result.get(row['user_id'])
+                if counts is not None and row['prayer_name'] in counts and row['count']:
+                    counts[row['prayer_name']] = row['count']
+        return result
+    except Exception as e:
+        logger.error(f"get_users_qazo xato: {e}")
+        return result
+
+
+async def iter_reminder_recipients(user_ids: Optional[List[int]] = None,
+                                   page_size: int = 500) -> AsyncIterator[tuple]:
+    """
+    Admin bo'lmagan foydalanuvchilar (user_ids berilsa, faqat ular orasidan) va ularning 6 ta qazo sonini
+    user_id bo'yicha keyset sahifalab berish.
+    Qatorlar bazada yig'iladi (pivot); har sahifadan keyin ulanish pool ga qaytariladi,
+    shuning uchun sekin (tezlik cheklangan) yuborish paytida ulanish band qilinmaydi.
+    """
+    if _qazo_wide():
+        columns = ", ".join(f"COALESCE(c.{p}, 0) AS {p}" for p in QAZO_PRAYERS)
+        source = "LEFT JOIN qazo_counts c ON c.user_id = u.user_id"
+        group_by = ""
+    else:
+        columns = ", ".join(
+            f"COALESCE(MAX(q.count) FILTER (WHERE q.prayer_name = '{p}'), 0) AS {p}" for p in QAZO_PRAYERS
+        )
+        source = "LEFT JOIN qazo q ON q.user_id = u.user_id"
+        group_by = "GROUP BY u.user_id"
+    query = f"""
+             SELECT u.user_id, {columns}
+             FROM users u {source}
+             WHERE NOT COALESCE(u.is_admin OR u.is_main_admin, FALSE)
+               AND u.user_id <> $1
+               AND u.user_id > $2
+               AND ($4::bigint[] IS NULL OR u.user_id = ANY ($4::bigint[]))
+             {group_by}
+             ORDER BY u.user_id
+             LIMIT $3
+             """
+    after_user_id = -1
+    while True:
+        pool = await get_connection()
+        async with pool.acquire(label="iter_reminder_recipients") as conn:
+            rows = await conn.fetch(query, ADMIN_ID or 0, after_user_id, page_size, user_ids)
+        for row in rows:
+            yield row['user_id'], {p: row[p] for p in QAZO_PRAYERS}
+        if len(rows) < page_size:
+            return
+        after_user_id = rows[-1]['user_id']
+
+
+async def set_reminder_time(user_id: int, reminder_time, timezone: Optional[str] = None) -> bool:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="set_reminder_time") as conn, conn.transaction():
+            await conn.execute("UPDATE users SET reminder_time = $2, timezone = $3 WHERE user_id = $1",
+                               user_id, reminder_time, timezone)
+            result = await conn.execute(f"""
+                                        UPDATE users
+                                        SET next_reminder_at = {_next_reminder_sql("NOW()")}
+                                        WHERE user_id = $1
+                                        """, user_id)
+            return result != "UPDATE 0"
+    except Exception as e:
+        logger.error(f"set_reminder_time xato: {e}")
+        return False
+
+
+async def get_reminder_settings(user_id: int) -> Optional[dict]:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_reminder_settings") as conn:
+            row = await conn.fetchrow("""
+                                      SELECT reminder_time, timezone, next_reminder_at
+                                      FROM users
+                                      WHERE user_id = $1
+                                      """, user_id)
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"get_reminder_settings xato: {e}")
+        return None
+
+
+async def claim_due_reminders(limit: int, grace_minutes: int) -> tuple:
+    """
+    Vaqti kelgan foydalanuvchilarni band qilib, keyingi eslatma vaqtini surish (indeks bo'yicha).
+    (band qilinganlar soni, yuborilishi kerak bo'lgan user_id lar) qaytariladi;
+    grace_minutes dan eski (masalan, bot o'chiq bo'lganda o'tib ketgan) eslatmalar yuborilmaydi.
+    """
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="claim_due_reminders") as conn:
+            rows = await conn.fetch(f"""
+                                    WITH due AS (SELECT user_id, next_reminder_at
+                                                 FROM users
+                                                 WHERE next_reminder_at <= NOW()
+                                                 ORDER BY next_reminder_at
+                                                 LIMIT $1 FOR UPDATE SKIP LOCKED)
+                                    UPDATE users u
+                                    SET next_reminder_at = {_next_reminder_sql("NOW()", "u.")}
+                                    FROM due
+                                    WHERE u.user_id = due.user_id
+                                    RETURNING u.user_id,
+                                        due.next_reminder_at >= NOW() - make_interval(mins => $2) AS on_time
+                                    """, limit, grace_minutes)
+            return len(rows), [row['user_id'] for row in rows if row['on_time']]
+    except Exception as e:
+        logger.error(f"claim_due_reminders xato: {e}")
+        return 0, []
+
+
+async def claim_update_ids(update_ids: List[int]) -> Optional[set]:
+    """Birinchi marta ko'rilgan update_id larni qaytarish; xatoda None"""
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="claim_update_ids") as conn:
+            rows = await conn.fetch("""
+                                    INSERT INTO processed_updates (update_id)
+                                    SELECT unnest($1::bigint[])
+                                    ON CONFLICT DO NOTHING
+                                    RETURNING update_id
+                                    """, update_ids)
+            return {row['update_id'] for row in rows}
+    except Exception as e:
+        logger.error(f"claim_update_ids xato: {e}")
+        return None
+
+
+async def delete_old_update_ids(max_age_hours: int = 24, batch_size: int = 5000) -> int:
+    """Telegram bir kundan keyin update ni qayta yubormaydi - eski yozuvlar bo'laklab o'chiriladi"""
+    deleted = 0
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="delete_old_update_ids") as conn:
+            while True:
+                result = await conn.execute("""
+                                            DELETE
+                                            FROM processed_updates
+                                            WHERE ctid IN (SELECT ctid
+                                                           FROM processed_updates
+                                                           WHERE created_at < NOW() - make_interval(hours => $1)
+                                                           LIMIT $2)
+                                            """, max_age_hours, batch_size)
+                count = int(result.split()[-1])
+                deleted += count
+                if count < batch_size:
+                    break
+    except Exception as e:
+        logger.error(f"delete_old_update_ids xato: {e}")
+    return deleted
+
+
+async def delete_expired_fsm_states(batch_size: int = 5000) -> int:
+    """Muddati o'tgan FSM yozuvlarini bo'laklab o'chirish (uzun qulflarsiz)"""
+    deleted = 0
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="delete_expired_fsm_states") as conn:
+            while True:
+                result = await conn.execute("""
+                                            DELETE
+                                            FROM fsm_storage
+                                            WHERE ctid IN (SELECT ctid
+                                                           FROM fsm_storage
+                                                           WHERE expires_at < NOW()
+                                                           LIMIT $1)
+                                            """, batch_size)
+                count = int(result.split()[-1])
+                deleted += count
+                if count < batch_size:
+                    break
+    except Exception as e:
+        logger.error(f"delete_expired_fsm_states xato: {e}")
+    return deleted
+
+
 async def update_qazo_count(user_id: int, prayer: str, delta: int):
     try:
         pool = await get_connection()
-        async with pool.acquire() as conn:
+        async with pool.acquire(label="update_qazo_count") as conn:
             await conn.execute("""
                                INSERT INTO qazo (user_id, prayer_name, count)
                                VALUES ($1, $2, GREATEST($3, 0)) ON CONFLICT (user_id, prayer_name)
@@ -315,12 +1258,187 @@ async def update_qazo_count(user_id: int, prayer: str, delta: int):
         logger.error(f"update_qazo_count xato: {e}")
 
 
+async def add_qazo_for_all_prayers(user_id: int, amount: int) -> bool:
+    """Barcha namozlar uchun qazo sonini bir so'rovda oshirish; xatoda (masalan, INTEGER to'lishi) False"""
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="add_qazo_for_all_prayers") as conn:
+            if _qazo_wide():
+                updates = ", ".join(f"{p} = qazo_counts.{p} + EXCLUDED.{p}" for p in QAZO_PRAYERS)
+                await conn.execute(f"""
+                                   INSERT INTO qazo_counts (user_id, {", ".join(QAZO_PRAYERS)})
+                                   VALUES ($1, {", ".join(["$2"] * len(QAZO_PRAYERS))}) ON CONFLICT (user_id)
+                    DO
+                                   UPDATE SET {updates}
+                                   """, user_id, amount)
+                return True
+            await conn.execute("""
+                               INSERT INTO qazo (user_id, prayer_name, count)
+                               SELECT $1, prayer, $3
+                               FROM unnest($2::text[]) AS prayer ON CONFLICT (user_id, prayer_name)
+                DO
+                               UPDATE SET count = qazo.count + EXCLUDED.count
+                               """, user_id, QAZO_PRAYERS, amount)
+        return True
+    except Exception as e:
+        logger.error(f"add_qazo_for_all_prayers xato: {e}")
+        return False
+
+
+async def apply_qazo_deltas(deltas: Dict[tuple, int]) -> bool:
+    """{(user_id, prayer): delta} ni bitta tranzaksiyada ko'p qatorli yozish (0 dan pastga tushmaydi)"""
+    if not deltas:
+        return True
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="apply_qazo_deltas") as conn:
+            async with conn.transaction():
+                if _qazo_wide():
+                    per_user: Dict[int, Dict[str, int]] = {}
+                    for (user_id, prayer), delta in deltas.items():
+                        per_user.setdefault(user_id, {})[_wide_column(prayer)] = delta
+                    user_ids = list(per_user)
+                    columns = [[per_user[u].get(p, 0) for u in user_ids] for p in QAZO_PRAYERS]
+                    await conn.execute("""
+                                       INSERT INTO qazo_counts (user_id)
+                                       SELECT u
+                                       FROM unnest($1::bigint[]) AS u
+                                       WHERE EXISTS (SELECT 1 FROM users WHERE users.user_id = u)
+                                       ON CONFLICT (user_id) DO NOTHING
+                                       """, user_ids)
+                    updates = ", ".join(f"{p} = GREATEST(q.{p} + d.{p}, 0)" for p in QAZO_PRAYERS)
+                    arrays = ", ".join(f"${i + 2}::int[]" for i in range(len(QAZO_PRAYERS)))
+                    await conn.execute(f"""
+                                       UPDATE qazo_counts q
+                                       SET {updates}
+                                       FROM unnest($1::bigint[], {arrays}) AS d(user_id, {", ".join(QAZO_PRAYERS)})
+                                       WHERE q.user_id = d.user_id
+                                       """, user_ids, *columns)
+                    return True
+
+                user_ids = [key[0] for key in deltas]
+                prayers = [key[1] for key in deltas]
+                values = list(deltas.values())
+                # Avval qatorlar mavjudligini ta'minlaymiz, keyin barcha deltalarni bitta UPDATE bilan qo'llaymiz
+                await conn.execute("""
+                                   INSERT INTO qazo (user_id, prayer_name, count)
+                                   SELECT d.user_id, d.prayer_name, 0
+                                   FROM unnest($1::bigint[], $2::text[]) AS d(user_id, prayer_name)
+                                   WHERE EXISTS (SELECT 1 FROM users WHERE users.user_id = d.user_id)
+                                   ON CONFLICT (user_id, prayer_name) DO NOTHING
+                                   """, user_ids, prayers)
+                await conn.execute("""
+                                   UPDATE qazo q
+                                   SET count = GREATEST(q.count + d.delta, 0)
+                                   FROM unnest($1::bigint[], $2::text[], $3::int[]) AS d(user_id, prayer_name, delta)
+                                   WHERE q.user_id = d.user_id
+                                     AND q.prayer_name = d.prayer_name
+                                   """, user_ids, prayers, values)
+        return True
+    except Exception as e:
+        logger.error(f"apply_qazo_deltas xato: {e}")
+        return False
+
+
+PRAYER_TIME_COLUMNS = ["fajr", "sunrise", "dhuhr", "asr", "maghrib", "isha"]
+PRAYER_TIME_KEYS = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]
+
+
+def _prayer_times_row_to_dict(row) -> dict:
+    return {key: row[col].strftime("%H:%M") for key, col in zip(PRAYER_TIME_KEYS, PRAYER_TIME_COLUMNS)}
+
+
+async def save_prayer_times(rows: list) -> int:
+    """(city, date, fajr, sunrise, dhuhr, asr, maghrib, isha, source) qatorlarini COPY orqali yozish"""
+    if not rows:
+        return 0
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="save_prayer_times") as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                                   CREATE TEMP TABLE prayer_times_load
+                                       (LIKE prayer_times) ON COMMIT DROP
+                                   """)
+                await conn.copy_records_to_table("prayer_times_load", records=rows)
+                await conn.execute("""
+                                   INSERT INTO prayer_times
+                                   SELECT * FROM prayer_times_load
+                                   ON CONFLICT (city, date) DO UPDATE
+                                       SET fajr    = EXCLUDED.fajr,
+                                           sunrise = EXCLUDED.sunrise,
+                                           dhuhr   = EXCLUDED.dhuhr,
+                                           asr     = EXCLUDED.asr,
+                                           maghrib = EXCLUDED.maghrib,
+                                           isha    = EXCLUDED.isha,
+                                           source  = EXCLUDED.source
+                                   -- offline hisob API dan olingan qatorni almashtirmaydi
+                                   WHERE prayer_times.source = 'local' OR EXCLUDED.source = 'api'
+                                   """)
+        logger.info(f"Namoz vaqtlari saqlandi: {len(rows)} qator")
+        return len(rows)
+    except Exception as e:
+        logger.error(f"save_prayer_times xato: {e}")
+        return 0
+
+
+async def get_city_prayer_times(city: str, day: date) -> Optional[dict]:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_city_prayer_times") as conn:
+            row = await conn.fetchrow("""
+                                      SELECT fajr, sunrise, dhuhr, asr, maghrib, isha
+                                      FROM prayer_times
+                                      WHERE city = $1
+                                        AND date = $2
+                                      """, city, day)
+            return _prayer_times_row_to_dict(row) if row else None
+    except Exception as e:
+        logger.error(f"get_city_prayer_times xato: {e}")
+        return None
+
+
+async def get_prayer_times_for_date(day: date) -> Dict[str, dict]:
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="get_prayer_times_for_date") as conn:
+            rows = await conn.fetch("""
+                                    SELECT city, fajr, sunrise, dhuhr, asr, maghrib, isha
+                                    FROM prayer_times
+                                    WHERE date = $1
+                                    """, day)
+            return {row['city']: _prayer_times_row_to_dict(row) for row in rows}
+    except Exception as e:
+        logger.error(f"get_prayer_times_for_date xato: {e}")
+        return {}
+
+
+async def count_prayer_times_by_city(start: date, end: date, source: Optional[str] = None) -> Dict[str, int]:
+    """Oraliqdagi qatorlar soni shaharlar bo'yicha (source berilsa, faqat shu manbadan)"""
+    try:
+        pool = await get_connection()
+        async with pool.acquire(label="count_prayer_times_by_city") as conn:
+            rows = await conn.fetch("""
+                                    SELECT city, COUNT(*) AS days
+                                    FROM prayer_times
+                                    WHERE date >= $1
+                                      AND date < $2
+                                      AND ($3::text IS NULL OR source = $3)
+                                    GROUP BY city
+                                    """, start, end, source)
+            return {row['city']: row['days'] for row in rows}
+    except Exception as e:
+        logger.error(f"count_prayer_times_by_city xato: {e}")
+        return {}
+
+
 async def is_user_exists(user_id: int) -> bool:
     return await user_exists(user_id)
 
 
 async def close_db():
     global pool
+    await stop_reference_listener()
     if pool:
         await pool.close()
         logger.info("Ma'lumotlar bazasi ulanishi yopildi")
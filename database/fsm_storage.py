@@ -0,0 +1,126 @@
+import json
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject
+
+from config import FSM_STORAGE, FSM_STATE_TTL, REDIS_URL
+from database.db import get_connection
+
+logger = logging.getLogger(__name__)
+
+_Row = Tuple[Optional[str], Dict[str, Any]]
+_KeyTuple = Tuple[int, int, int, int, str]
+
+# Bitta update davomida o'qilgan holatlar: FSM middleware, filtrlar va handler bazaga qayta bormaydi
+_read_cache: ContextVar[Optional[Dict[_KeyTuple, _Row]]] = ContextVar("fsm_read_cache", default=None)
+
+
+def _key_tuple(key: StorageKey) -> _KeyTuple:
+    return key.bot_id, key.chat_id, key.user_id, key.thread_id or 0, key.destiny
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+def _update_cache() -> Dict[_KeyTuple, _Row]:
+    cache = _read_cache.get()
+    if cache is None:
+        cache = {}
+        _read_cache.set(cache)
+    return cache
+
+
+class FSMReadCacheMiddleware(BaseMiddleware):
+    """Update tugagach o'qish keshini tozalash (ketma-ket ishlov berishda keyingi update ga o'tmasligi uchun)"""
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        try:
+            return await handler(event, data)
+        finally:
+            cache = _read_cache.get()
+            if cache:
+                cache.clear()
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM holati va ma'lumotlari fsm_storage jadvalida (asyncpg pool orqali).
+    Har bir yozuv bitta upsert; muddati o'tganlar delete_expired() bilan bo'laklab o'chiriladi.
+    """
+
+    def __init__(self, ttl: Optional[float] = FSM_STATE_TTL):
+        self.ttl = ttl
+
+    async def _read(self, key: StorageKey) -> _Row:
+        cache = _update_cache()
+        key_tuple = _key_tuple(key)
+        if key_tuple in cache:
+            return cache[key_tuple]
+        pool = await get_connection()
+        async with pool.acquire(label="PostgresStorage._read") as conn:
+            row = await conn.fetchrow("""
+                                      SELECT state, data
+                                      FROM fsm_storage
+                                      WHERE bot_id = $1 AND chat_id = $2 AND user_id = $3
+                                        AND thread_id = $4 AND destiny = $5
+                                        AND (expires_at IS NULL OR expires_at > NOW())
+                                      """, *key_tuple)
+        result = (row['state'], json.loads(row['data'])) if row else (None, {})
+        cache[key_tuple] = result
+        return result
+
+    async def _write(self, key: StorageKey, column: str, value: Any):
+        # column faqat "state" yoki "data" bo'ladi
+        key_tuple = _key_tuple(key)
+        pool = await get_connection()
+        async with pool.acquire(label="PostgresStorage._write") as conn:
+            await conn.execute(f"""
+                               INSERT INTO fsm_storage (bot_id, chat_id, user_id, thread_id, destiny, {column},
+                                                        expires_at)
+                               VALUES ($1, $2, $3, $4, $5, $6,
+                                       NOW() + make_interval(secs => $7::double precision))
+                               ON CONFLICT (bot_id, chat_id, user_id, thread_id, destiny) DO UPDATE
+                                   SET {column} = EXCLUDED.{column}, expires_at = EXCLUDED.expires_at
+                               """, *key_tuple, value, self.ttl)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = _state_name(state)
+        await self._write(key, "state", state)
+        cache = _update_cache()
+        key_tuple = _key_tuple(key)
+        if key_tuple in cache:
+            cache[key_tuple] = (state, cache[key_tuple][1])
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._read(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._write(key, "data", json.dumps(data, ensure_ascii=False))
+        cache = _update_cache()
+        key_tuple = _key_tuple(key)
+        if key_tuple in cache:
+            cache[key_tuple] = (cache[key_tuple][0], dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return dict((await self._read(key))[1])
+
+    async def close(self) -> None:
+        pass
+
+
+def create_storage() -> BaseStorage:
+    """FSM_STORAGE: "postgres" (standart), "redis" yoki "memory" (faqat lokal sinov uchun)"""
+    if FSM_STORAGE == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+        return RedisStorage.from_url(REDIS_URL, state_ttl=FSM_STATE_TTL, data_ttl=FSM_STATE_TTL)
+    if FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return PostgresStorage()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set, Tuple
+
+from config import QAZO_FLUSH_INTERVAL_MS, QAZO_BUFFER_MAX_KEYS
+from database.db import QAZO_PRAYERS, apply_qazo_deltas, get_user_qazo
+
+logger = logging.getLogger(__name__)
+
+# ➕/➖ bosishlari shu yerda yig'iladi va davriy ravishda bitta so'rov bilan bazaga yoziladi
+_pending: Dict[Tuple[int, str], int] = {}
+_flushing: Dict[Tuple[int, str], int] = {}
+_flush_lock = asyncio.Lock()
+# Flush boshlanganda va tugaganda oshiriladi (toq - flush davom etmoqda); o'qish shu bilan tekshiriladi
+_flush_generation = 0
+_flush_idle = asyncio.Event()
+_flush_idle.set()
+_flush_task: Optional[asyncio.Task] = None
+# create_task natijasiga kuchli havola saqlanmasa, vazifa GC tomonidan yig'ilishi mumkin
+_background_tasks: Set[asyncio.Task] = set()
+buffer_stats = {"taps": 0, "flushes": 0, "rows_written": 0}
+
+
+def add_qazo_delta(user_id: int, prayer: str, delta: int):
+    if prayer not in QAZO_PRAYERS or delta == 0:
+        return
+    key = (user_id, prayer)
+    _pending[key] = _pending.get(key, 0) + delta
+    if _pending[key] == 0:
+        del _pending[key]
+    buffer_stats["taps"] += 1
+    if len(_pending) >= QAZO_BUFFER_MAX_KEYS and not _background_tasks:
+        task = asyncio.create_task(flush_qazo_buffer())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+def pending_qazo_deltas(user_id: int) -> Dict[str, int]:
+    deltas = {}
+    for source in (_flushing, _pending):
+        for prayer in QAZO_PRAYERS:
+            delta = source.get((user_id, prayer))
+            if delta:
+                deltas[prayer] = deltas.get(prayer, 0) + delta
+    return deltas
+
+
+async def get_user_qazo_buffered(user_id: int) -> dict:
+    """Bazadagi son + hali yozilmagan o'zgarishlar"""
+    # Bazadan o'qish paytida flush commit qilinsa, deltalar ikki marta qo'shilishi yoki tushib qolishi
+    # mumkin: o'qish flush yo'q paytda boshlanib, flush generatsiyasi o'zgarmagan bo'lishi kerak
+    for _ in range(3):
+        await _flush_idle.wait()
+        generation = _flush_generation
+        counts = await get_user_qazo(user_id)
+        if generation == _flush_generation:
+            break
+    for prayer, delta in pending_qazo_deltas(user_id).items():
+        counts[prayer] = max(counts.get(prayer, 0) + delta, 0)
+    return counts
+
+
+async def flush_qazo_buffer():
+    global _pending, _flushing, _flush_generation
+    async with _flush_lock:
+        if not _pending:
+            return
+        _flushing, _pending = _pending, {}
+        _flush_generation += 1
+        _flush_idle.clear()
+        try:
+            if await apply_qazo_deltas(_flushing):
+                buffer_stats["flushes"] += 1
+                buffer_stats["rows_written"] += len(_flushing)
+            else:
+                # Yozilmagan o'zgarishlar keyingi urinishga qaytariladi
+                for key, delta in _flushing.items():
+                    _pending[key] = _pending.get(key, 0) + delta
+                logger.warning(f"Qazo buferi yozilmadi, qayta urinadi: {len(_flushing)} ta kalit")
+        finally:
+            _flushing = {}
+            _flush_generation += 1
+            _flush_idle.set()
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(QAZO_FLUSH_INTERVAL_MS / 1000)
+        try:
+            await flush_qazo_buffer()
+        except Exception as e:
+            logger.error(f"_flush_loop xato: {e}")
+
+
+def start_qazo_buffer():
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_loop())
+        logger.info("Qazo yozish buferi ishga tushdi")
+
+
+async def stop_qazo_buffer():
+    global _flush_task
+    if _flush_task:
+        _flush_task.cancel()
+        _flush_task = None
+    await flush_qazo_buffer()
+    logger.info("Qazo yozish buferi bazaga yozildi va to'xtatildi")
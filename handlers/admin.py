@@ -5,10 +5,11 @@ from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 
 from config import ADMIN_ID
-from database.db import is_admin, get_stats, get_all_users, add_channel, remove_channel, add_faq, get_all_channels, \
-    add_admin, remove_admin, get_all_admins
-from keyboards.default import admin_menu, main_menu, back_button_only
+from database.db import is_admin, get_stats, add_channel, remove_channel, add_faq, get_all_channels, \
+    add_admin, remove_admin, get_all_admins, create_broadcast_job, get_broadcast_jobs, set_broadcast_job_status
+from keyboards.default import admin_menu, main_menu, back_button_only, broadcast_jobs_menu
 from states.states import AdminState, FaqStates
+from utils.broadcast_jobs import start_broadcast_job
 
 logging.basicConfig(
     level=logging.INFO,
@@ -71,20 +72,17 @@ async def ask_broadcast(callback: types.CallbackQuery, state: FSMContext):
 @router.message(StateFilter(AdminState.waiting_for_broadcast))
 async def process_broadcast(message: types.Message, state: FSMContext):
     try:
-        users = await get_all_users()
-        count = 0
-        for u in users:
-            if not await is_admin(u["user_id"]):
-                try:
-                    await message.bot.send_message(u["user_id"], message.text)
-                    count += 1
-                except Exception as e:
-                    logger.warning(f"Xabar yuborishda xato: user_id={u['user_id']}, {e}")
+        # Yuborish fonda, bazadagi ish sifatida ishlaydi: qayta ishga tushishda davom etadi
+        progress = await message.answer("📣 Xabar yuborish boshlandi...")
+        job_id = await create_broadcast_job(message.from_user.id, message.text, progress.chat.id, progress.message_id)
+        if job_id is None:
+            raise RuntimeError("broadcast ishi yaratilmadi")
+        start_broadcast_job(message.bot, job_id)
         await message.answer(
-            f"✅ Xabar {count} foydalanuvchiga yuborildi.",
+            f"✅ Xabar yuborish navbatga qo'yildi (#{job_id}).",
             reply_markup=admin_menu(is_main_admin=message.from_user.id == ADMIN_ID)
         )
-        logger.info(f"Xabar yuborildi: {count} foydalanuvchiga, user_id={message.from_user.id}")
+        logger.info(f"Broadcast ishi yaratildi: job_id={job_id}, user_id={message.from_user.id}")
     except Exception as e:
         logger.error(f"process_broadcast da xato: user_id={message.from_user.id}, {e}")
         await message.answer(
@@ -93,6 +91,45 @@ async def process_broadcast(message: types.Message, state: FSMContext):
         )
     await state.clear()
 
+@router.callback_query(F.data == "admin_broadcast_jobs")
+async def show_broadcast_jobs(callback: types.CallbackQuery):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ Siz admin emassiz.", show_alert=True)
+        return
+    jobs = await get_broadcast_jobs(["running", "paused"])
+    if not jobs:
+        await callback.message.answer("📭 Faol xabar yuborishlar yo'q.", reply_markup=back_button_only())
+    else:
+        text = "<b>📣 Xabar yuborishlar:</b>\n\n"
+        for job in jobs:
+            status = "▶️ Davom etmoqda" if job["status"] == "running" else "⏸ Pauzada"
+            text += f"#{job['id']} — {status}, ✅ {job['sent']}, ⚠️ {job['blocked'] + job['not_found'] + job['failed']}\n"
+        await callback.message.answer(text, reply_markup=broadcast_jobs_menu(jobs))
+    await callback.answer()
+
+@router.callback_query(F.data.regexp(r"^bjob_(pause|resume|cancel)_\d+$"))
+async def control_broadcast_job(callback: types.CallbackQuery):
+    if not await is_admin(callback.from_user.id):
+        await callback.answer("❌ Siz admin emassiz.", show_alert=True)
+        return
+    _, action, job_id = callback.data.split("_")
+    job_id = int(job_id)
+    if action == "pause":
+        ok = await set_broadcast_job_status(job_id, "paused", ["running"])
+    elif action == "resume":
+        ok = await set_broadcast_job_status(job_id, "running", ["paused"])
+        if ok:
+            start_broadcast_job(callback.bot, job_id)
+    else:
+        ok = await set_broadcast_job_status(job_id, "cancelled", ["running", "paused"])
+    logger.info(f"Broadcast ishi boshqarildi: job_id={job_id}, action={action}, ok={ok}, user_id={callback.from_user.id}")
+    await callback.answer("✅ Bajarildi" if ok else "⚠️ Ish holati o'zgargan", show_alert=not ok)
+    jobs = await get_broadcast_jobs(["running", "paused"])
+    try:
+        await callback.message.edit_reply_markup(reply_markup=broadcast_jobs_menu(jobs))
+    except Exception as e:
+        logger.warning(f"Broadcast menyusini yangilashda xato: {e}")
+
 @router.callback_query(F.data == "admin_add_channel")
 async def ask_add_channel(callback: types.CallbackQuery, state: FSMContext):
     if not await is_admin(callback.from_user.id):
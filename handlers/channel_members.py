@@ -0,0 +1,32 @@
+import logging
+
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from database.db import get_all_channels, set_channel_members
+from utils.subscription import remember_member_status, member_status
+
+router = Router()
+
+
+def _match_channel(update: ChatMemberUpdated, channels: list):
+    """channels jadvalidagi yozuv (-100... id yoki @username) bilan chatni moslashtirish"""
+    names = {str(update.chat.id)}
+    if update.chat.username:
+        names.add(f"@{update.chat.username.lower()}")
+    for channel in channels:
+        if channel.lower() in names:
+            return channel
+    return None
+
+
+@router.chat_member()
+async def track_channel_member(update: ChatMemberUpdated):
+    channel = _match_channel(update, await get_all_channels())
+    if channel is None:
+        return
+    user_id = update.new_chat_member.user.id
+    status = member_status(update.new_chat_member)
+    await set_channel_members([(channel, user_id, status)])
+    remember_member_status(user_id, channel, status)
+    logging.info(f"Kanal a'zoligi yangilandi: channel={channel}, user_id={user_id}, status={status}")
@@ -1,23 +1,50 @@
 import logging
 
 from aiogram import types, Dispatcher, F, Router
+from aiogram.filters import StateFilter
+from aiogram.fsm.context import FSMContext
 
-from database.db import get_all_faq
+from config import FAQ_PAGE_SIZE
+from database.db import get_faq, get_faq_page, get_reference_version, search_faq
+from states.states import FaqSearchState
 
 router = Router()
 
+FAQ_LIST_TEXT = "<b>❓ Tez-tez so'raladigan savollar:</b>\n\nQuyidagi savollardan birini tanlang:"
+
+# FAQ sahifalari klaviaturasi har bir FAQ versiyasi uchun bir marta tuziladi
+_faq_menu_cache = {"version": None, "pages": {}}
+
+
+async def get_faq_menu(cursor_id: int = 0, backward: bool = False):
+    """Sahifada savol bo'lmasa None, aks holda keshdagi klaviatura"""
+    from keyboards.default import faq_menu
+    version = get_reference_version("faq")
+    if _faq_menu_cache["version"] != version:
+        _faq_menu_cache.update(version=version, pages={})
+    key = (cursor_id, backward)
+    markup = _faq_menu_cache["pages"].get(key)
+    if markup is not None:
+        return markup
+    faqs, has_prev, has_next = await get_faq_page(cursor_id, FAQ_PAGE_SIZE, backward)
+    if not faqs:
+        return None
+    markup = faq_menu(faqs, has_prev, has_next)
+    if get_reference_version("faq") == version:
+        _faq_menu_cache["pages"][key] = markup
+    return markup
+
+
 @router.callback_query(F.data == "faq")
 async def faq_command(callback: types.CallbackQuery):
-    from keyboards.default import faq_menu, main_menu
+    from keyboards.default import main_menu
     try:
-        faqs = await get_all_faq()
-        if not faqs:
+        kb = await get_faq_menu()
+        if kb is None:
             await callback.message.answer("❌ Hozircha savollar mavjud emas.", reply_markup=main_menu())
             await callback.answer()
             return
-        text = "<b>❓ Tez-tez so'raladigan savollar:</b>\n\nQuyidagi savollardan birini tanlang:"
-        kb = faq_menu(faqs)
-        await callback.message.edit_text(text, reply_markup=kb)
+        await callback.message.edit_text(FAQ_LIST_TEXT, reply_markup=kb)
         logging.info(f"FAQ ro'yxati ko'rsatildi: user_id={callback.from_user.id}")
     except Exception as e:
         logging.error(f"faq_command da xato: {e}, user_id={callback.from_user.id}")
@@ -29,8 +56,7 @@ async def faq_answer(callback: types.CallbackQuery):
     from keyboards.default import back_to_faq_menu, main_menu
     try:
         faq_id = int(callback.data.replace("faq_answer_", ""))
-        faqs = await get_all_faq()
-        faq = next((f for f in faqs if f["id"] == faq_id), None)
+        faq = await get_faq(faq_id)
         if faq:
             answer = faq["answer"]
             video_url = faq["video_url"]
@@ -47,17 +73,49 @@ async def faq_answer(callback: types.CallbackQuery):
         await callback.message.answer("❌ Xatolik yuz berdi.", reply_markup=main_menu())
     await callback.answer()
 
+@router.callback_query(F.data.regexp(r"^faq_page_[np]_\d+$"))
+async def faq_page(callback: types.CallbackQuery):
+    try:
+        _, _, direction, cursor_id = callback.data.split("_")
+        kb = await get_faq_menu(int(cursor_id), backward=direction == "p")
+        if kb is None:
+            await callback.answer("❌ Bu sahifada savollar yo'q.", show_alert=True)
+            return
+        await callback.message.edit_text(FAQ_LIST_TEXT, reply_markup=kb)
+        logging.info(f"FAQ sahifasi ko'rsatildi: {callback.data}, user_id={callback.from_user.id}")
+    except Exception as e:
+        logging.error(f"faq_page da xato: {e}, callback.data={callback.data}, user_id={callback.from_user.id}")
+    await callback.answer()
+
+@router.callback_query(F.data == "faq_search")
+async def faq_search(callback: types.CallbackQuery, state: FSMContext):
+    from keyboards.default import back_to_faq_menu
+    await state.set_state(FaqSearchState.waiting_for_query)
+    await callback.message.edit_text("🔍 Savolingizni yozing:", reply_markup=back_to_faq_menu())
+    logging.info(f"FAQ qidiruvi so'raldi: user_id={callback.from_user.id}")
+    await callback.answer()
+
+@router.message(StateFilter(FaqSearchState.waiting_for_query), F.text)
+async def process_faq_search(message: types.Message, state: FSMContext):
+    from keyboards.default import faq_search_menu
+    await state.clear()
+    results = await search_faq(message.text)
+    if results:
+        await message.answer("🔍 Topilgan savollar:", reply_markup=faq_search_menu(results))
+    else:
+        await message.answer("❌ Hech narsa topilmadi.", reply_markup=faq_search_menu([]))
+    logging.info(f"FAQ qidiruvi: natijalar={len(results)}, user_id={message.from_user.id}")
+
 @router.callback_query(F.data == "back_to_faq_list")
-async def back_to_faq_list(callback: types.CallbackQuery):
-    from keyboards.default import faq_menu, main_menu
+async def back_to_faq_list(callback: types.CallbackQuery, state: FSMContext):
+    from keyboards.default import main_menu
+    await state.clear()
     try:
-        faqs = await get_all_faq()
-        if not faqs:
+        kb = await get_faq_menu()
+        if kb is None:
             await callback.message.edit_text("❌ Hozircha savollar mavjud emas.", reply_markup=main_menu())
         else:
-            text = "<b>❓ Tez-tez so'raladigan savollar:</b>\n\nQuyidagi savollardan birini tanlang:"
-            kb = faq_menu(faqs)
-            await callback.message.edit_text(text, reply_markup=kb)
+            await callback.message.edit_text(FAQ_LIST_TEXT, reply_markup=kb)
         logging.info(f"FAQ ro'yxatiga qaytildi: user_id={callback.from_user.id}")
     except Exception as e:
         logging.error(f"back_to_faq_list da xato: {e}, user_id={callback.from_user.id}")
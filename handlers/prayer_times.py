@@ -1,11 +1,10 @@
 import logging
-from datetime import datetime
 
 from aiogram import types, Dispatcher, F, Router
 from aiogram.enums.parse_mode import ParseMode
 
 from keyboards.default import prayer_regions_menu, prayer_cities_menu, prayer_times_menu
-from utils.namoz_parser import get_prayer_times
+from utils.namoz_parser import get_prayer_times, today_local
 
 router = Router()
 
@@ -40,7 +39,7 @@ async def show_times(callback: types.CallbackQuery):
     try:
         full_data = callback.data.replace("city_", "")
         city, region = full_data.split("_", 1)
-        times = get_prayer_times(city)
+        times = await get_prayer_times(city)
         if not times:
             await callback.message.edit_text("❌ Namoz vaqtlarini olishda xatolik.", parse_mode=ParseMode.HTML)
             await callback.answer()
@@ -52,7 +51,7 @@ async def show_times(callback: types.CallbackQuery):
             "Asr": "Asr", "Maghrib": "Shom", "Isha": "Xufton"
         }
 
-        current_date = datetime.now().date()
+        current_date = today_local()
         text = f"🕌 <b>{city} shahri uchun {current_date} namoz vaqtlari:</b>\n\n"
         for k in keys:
             if k in times:
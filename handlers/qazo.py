@@ -1,12 +1,22 @@
-import sqlite3
 from aiogram import types, Dispatcher, F
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from database.db import add_qazo_for_all_prayers
+from database.qazo_buffer import add_qazo_delta, get_user_qazo_buffered
 from keyboards.default import main_menu, qazo_menu, qazo_hisoblash_menu
 from states.states import QazoHisobState
+from utils.render import schedule_render, remember_render
 
 prayer_names = ["bomdod", "peshin", "asr", "shom", "xufton", "vitr"]
+# Kalkulyator uchun yuqori chegara (100 yil); katta sonlar INTEGER ustunini to'ldirib yuboradi
+MAX_QAZO_DAYS = 100 * 365
+
+QAZO_MENU_TEXT = (
+    "<b>Sizdagi mavjud qazolar:</b>\n\n"
+    "– Qazo oson o‘qish usuli\n"
+    "– 1 oyda 15 yillik qazo o‘qish"
+)
 
 async def qazo_menu_handler(callback: types.CallbackQuery):
     """
@@ -14,25 +24,15 @@ async def qazo_menu_handler(callback: types.CallbackQuery):
     """
     user_id = callback.from_user.id
 
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        counts = {}
-        for p in prayer_names:
-            cursor.execute("SELECT count FROM qazo WHERE user_id=? AND prayer_name=?", (user_id, p))
-            row = cursor.fetchone()
-            counts[p] = row[0] if row else 0
-
-    text = (
-        "<b>Sizdagi mavjud qazolar:</b>\n\n"
-        "– Qazo oson o‘qish usuli\n"
-        "– 1 oyda 15 yillik qazo o‘qish"
-    )
+    counts = await get_user_qazo_buffered(user_id)
 
     kb = qazo_menu(counts)
     try:
-        await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
+        await callback.message.edit_text(QAZO_MENU_TEXT, reply_markup=kb, parse_mode="HTML")
+        sent = callback.message
     except:
-        await callback.message.answer(text, reply_markup=kb, parse_mode="HTML")
+        sent = await callback.message.answer(QAZO_MENU_TEXT, reply_markup=kb, parse_mode="HTML")
+    remember_render(sent.chat.id, sent.message_id, QAZO_MENU_TEXT, kb)
     await callback.answer()
 
 async def increment_qazo(callback: types.CallbackQuery):
@@ -42,15 +42,7 @@ async def increment_qazo(callback: types.CallbackQuery):
     user_id = callback.from_user.id
     prayer = callback.data.replace("inc_", "")
 
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO qazo (user_id, prayer_name, count)
-            VALUES (?, ?, 1)
-            ON CONFLICT(user_id, prayer_name)
-            DO UPDATE SET count = count + 1
-        """, (user_id, prayer))
-        conn.commit()
+    add_qazo_delta(user_id, prayer, 1)
 
     await callback.answer("➕ Qo‘shildi")
     await refresh_qazo_menu(callback)
@@ -62,42 +54,26 @@ async def decrement_qazo(callback: types.CallbackQuery):
     user_id = callback.from_user.id
     prayer = callback.data.replace("dec_", "")
 
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT count FROM qazo WHERE user_id=? AND prayer_name=?", (user_id, prayer))
-        current = cursor.fetchone()
-        current_count = current[0] if current else 0
-
-        if current_count > 0:
-            cursor.execute("UPDATE qazo SET count = count - 1 WHERE user_id=? AND prayer_name=?", (user_id, prayer))
-            conn.commit()
-            await callback.answer("➖ Ayirildi")
-            await refresh_qazo_menu(callback)
-        else:
-            await callback.answer("⚠️ 0 dan pastga tushmaydi", show_alert=True)
+    counts = await get_user_qazo_buffered(user_id)
+    if counts.get(prayer, 0) > 0:
+        add_qazo_delta(user_id, prayer, -1)
+        await callback.answer("➖ Ayirildi")
+        await refresh_qazo_menu(callback)
+    else:
+        await callback.answer("⚠️ 0 dan pastga tushmaydi", show_alert=True)
 
 async def refresh_qazo_menu(callback: types.CallbackQuery):
     """
-    Refreshes the entire qazo menu with updated counts.
+    Schedules a debounced re-render of the qazo menu; rapid taps collapse into one edit
+    with the final counts, including unflushed taps.
     """
     user_id = callback.from_user.id
 
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        counts = {}
-        for p in prayer_names:
-            cursor.execute("SELECT count FROM qazo WHERE user_id=? AND prayer_name=?", (user_id, p))
-            row = cursor.fetchone()
-            counts[p] = row[0] if row else 0
-
-    text = (
-        "<b>Sizdagi mavjud qazolar:</b>\n\n"
-        "– Qazo oson o‘qish usuli\n"
-        "– 1 oyda 15 yillik qazo o‘qish"
-    )
+    async def build():
+        counts = await get_user_qazo_buffered(user_id)
+        return QAZO_MENU_TEXT, qazo_menu(counts)
 
-    kb = qazo_menu(counts)
-    await callback.message.edit_text(text, reply_markup=kb, parse_mode="HTML")
+    schedule_render(callback.bot, callback.message.chat.id, callback.message.message_id, build)
 
 async def qazo_start(callback: types.CallbackQuery, state: FSMContext):
     """
@@ -142,22 +118,7 @@ async def process_qazo_years(message: types.Message, state: FSMContext):
     except ValueError:
         return await message.answer("❗ Iltimos, faqat musbat butun son kiriting.")
 
-    user_id = message.from_user.id
-    prayers = {p: 365 * years for p in prayer_names}
-
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        for p, c in prayers.items():
-            cursor.execute("""
-                INSERT INTO qazo (user_id, prayer_name, count)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id, prayer_name)
-                DO UPDATE SET count = count + ?
-            """, (user_id, p, c, c))
-        conn.commit()
-
-    await message.answer("✅ Yillik qazo hisoblandi.", reply_markup=main_menu())
-    await state.clear()
+    await save_calculated_qazo(message, state, 365 * years, "✅ Yillik qazo hisoblandi.")
 
 async def process_qazo_months(message: types.Message, state: FSMContext):
     """
@@ -170,22 +131,7 @@ async def process_qazo_months(message: types.Message, state: FSMContext):
     except ValueError:
         return await message.answer("❗ Iltimos, faqat musbat butun son kiriting.")
 
-    user_id = message.from_user.id
-    prayers = {p: 30 * months for p in prayer_names}
-
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        for p, c in prayers.items():
-            cursor.execute("""
-                INSERT INTO qazo (user_id, prayer_name, count)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id, prayer_name)
-                DO UPDATE SET count = count + ?
-            """, (user_id, p, c, c))
-        conn.commit()
-
-    await message.answer("✅ Oylik qazo hisoblandi.", reply_markup=main_menu())
-    await state.clear()
+    await save_calculated_qazo(message, state, 30 * months, "✅ Oylik qazo hisoblandi.")
 
 async def process_qazo_days(message: types.Message, state: FSMContext):
     """
@@ -198,21 +144,20 @@ async def process_qazo_days(message: types.Message, state: FSMContext):
     except ValueError:
         return await message.answer("❗ Iltimos, faqat musbat butun son kiriting.")
 
-    user_id = message.from_user.id
-    prayers = {p: days for p in prayer_names}
-
-    with sqlite3.connect("qazo_bot.db") as conn:
-        cursor = conn.cursor()
-        for p, c in prayers.items():
-            cursor.execute("""
-                INSERT INTO qazo (user_id, prayer_name, count)
-                VALUES (?, ?, ?)
-                ON CONFLICT(user_id, prayer_name)
-                DO UPDATE SET count = count + ?
-            """, (user_id, p, c, c))
-        conn.commit()
-
-    await message.answer("✅ Kunlik qazo hisoblandi.", reply_markup=main_menu())
+    await save_calculated_qazo(message, state, days, "✅ Kunlik qazo hisoblandi.")
+
+async def save_calculated_qazo(message: types.Message, state: FSMContext, days: int, done_text: str):
+    """
+    Adds the calculated number of days to every prayer, rejecting values above MAX_QAZO_DAYS.
+    """
+    if days > MAX_QAZO_DAYS:
+        return await message.answer(f"❗ Juda katta son. Ko‘pi bilan {MAX_QAZO_DAYS // 365} yil kiriting.")
+
+    if not await add_qazo_for_all_prayers(message.from_user.id, days):
+        await message.answer("❌ Qazolarni saqlab bo‘lmadi. Iltimos, qayta urinib ko‘ring.", reply_markup=main_menu())
+        return await state.clear()
+
+    await message.answer(done_text, reply_markup=main_menu())
     await state.clear()
 
 async def noop_handler(callback: types.CallbackQuery):
@@ -0,0 +1,50 @@
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from config import DEFAULT_TIMEZONE
+from database.db import set_reminder_time, get_reminder_settings
+
+router = Router()
+
+USAGE_TEXT = (
+    "⏰ Eslatma vaqtini o'zgartirish:\n"
+    "<code>/eslatma 21:30</code>\n"
+    "<code>/eslatma 21:30 Asia/Tashkent</code>"
+)
+
+
+@router.message(Command("eslatma"))
+async def reminder_settings(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not command.args:
+        settings = await get_reminder_settings(user_id)
+        if settings is None:
+            await message.answer("❌ Avval /start buyrug'ini bosing.")
+            return
+        timezone = settings['timezone'] or DEFAULT_TIMEZONE
+        if settings['reminder_time']:
+            current = f"{settings['reminder_time']:%H:%M} ({timezone})"
+        else:
+            next_at = settings['next_reminder_at']
+            current = f"{next_at.astimezone(ZoneInfo(timezone)):%H:%M} ({timezone}, avtomatik)" if next_at else "belgilanmagan"
+        await message.answer(f"⏰ Qazo eslatmasi vaqti: {current}\n\n{USAGE_TEXT}", parse_mode="HTML")
+        return
+
+    parts = command.args.split()
+    try:
+        reminder_time = datetime.strptime(parts[0], "%H:%M").time()
+        timezone = ZoneInfo(parts[1]).key if len(parts) > 1 else None
+    except Exception:
+        await message.answer(f"❌ Noto'g'ri format.\n\n{USAGE_TEXT}", parse_mode="HTML")
+        return
+
+    if await set_reminder_time(user_id, reminder_time, timezone):
+        await message.answer(f"✅ Eslatma vaqti {reminder_time:%H:%M} ga o'rnatildi.")
+        logging.info(f"Eslatma vaqti o'zgartirildi: user_id={user_id}, time={reminder_time}, tz={timezone}")
+    else:
+        await message.answer("❌ Eslatma vaqtini saqlashda xatolik.")
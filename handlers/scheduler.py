@@ -1,62 +1,126 @@
+import logging
+import time
+from typing import List, Optional
+
 from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from database.db import is_admin, get_all_users, get_user_qazo
+from config import REMINDER_BATCH_LIMIT, REMINDER_GRACE_MINUTES
+from database.db import iter_reminder_recipients, claim_due_reminders, delete_expired_fsm_states, \
+    delete_old_update_ids
+from keyboards.default import qazo_reminder_menu
+from utils.broadcast import Broadcaster
+from utils.metrics import observe_job
+from utils.namoz_parser import prewarm_prayer_times, ensure_month_prayer_times
+
+logger = logging.getLogger(__name__)
+
+REMINDER_TEXT = (
+    "<b>Bugungi qazo namozlaringiz:</b>\n\n"
+    "Quyidagi tugmalar orqali o'qigan yoki o'qimagan namozlaringizni belgilang."
+)
+
+
+async def send_qazo_reminder(bot: Bot, user_ids: Optional[List[int]] = None,
+                             broadcaster: Optional[Broadcaster] = None) -> dict:
+    """
+    Sends the reminder to non-admin users (all of them, or only user_ids) with their qazo counts.
+    Recipients and their counts are paged from the database by user_id and sent through the
+    rate-limited Broadcaster; each (user_id, counts) item is sent as is, so retries keep the counts.
+    """
+    async def send(item: tuple):
+        user_id, counts = item
+        await bot.send_message(user_id, REMINDER_TEXT, reply_markup=qazo_reminder_menu(counts), parse_mode="HTML")
 
-prayer_names = ["bomdod", "peshin", "asr", "shom", "xufton", "vitr"]
+    broadcaster = broadcaster or Broadcaster()
+    return await broadcaster.run(iter_reminder_recipients(user_ids), send)
 
 
-async def send_qazo_reminder(bot: Bot):
+async def send_due_reminders(bot: Bot):
     """
-    Sends a daily reminder to non-admin users with their qazo counts and inline buttons.
+    Runs every minute: claims users whose next_reminder_at has come (index range scan),
+    advances their next reminder and sends this small bucket through send_qazo_reminder.
     """
+    started = time.monotonic()
+    broadcaster = Broadcaster()
+    claimed_total = 0
     try:
-        users = await get_all_users()
-
-        for user_data in users:
-            user_id = user_data["user_id"]
-            if not await is_admin(user_id):
-                try:
-                    counts = await get_user_qazo(user_id)
-
-                    keyboard = []
-                    for prayer in prayer_names:
-                        keyboard.append([InlineKeyboardButton(text=prayer.capitalize(), callback_data="noop")])
-                        buttons = [
-                            InlineKeyboardButton(text="➖", callback_data=f"dec_{prayer}"),
-                            InlineKeyboardButton(text=str(counts.get(prayer, 0)), callback_data="noop"),
-                            InlineKeyboardButton(text="➕", callback_data=f"inc_{prayer}")
-                        ]
-                        keyboard.append(buttons)
-
-                    keyboard.append([InlineKeyboardButton(text="⬅️ Menyuga qaytish", callback_data="back_to_menu")])
-
-                    inline_kb = InlineKeyboardMarkup(inline_keyboard=keyboard)
-
-                    text = (
-                        "<b>Bugungi qazo namozlaringiz:</b>\n\n"
-                        "Quyidagi tugmalar orqali o'qigan yoki o'qimagan namozlaringizni belgilang."
-                    )
-
-                    await bot.send_message(user_id, text, reply_markup=inline_kb, parse_mode="HTML")
-                except Exception as e:
-                    print(f"Failed to send message to {user_id}: {e}")
+        while True:
+            claimed, user_ids = await claim_due_reminders(REMINDER_BATCH_LIMIT, REMINDER_GRACE_MINUTES)
+            claimed_total += claimed
+            if user_ids:
+                await send_qazo_reminder(bot, user_ids, broadcaster)
+            if claimed < REMINDER_BATCH_LIMIT:
+                break
     except Exception as e:
-        print(f"Error in send_qazo_reminder: {e}")
+        logger.error(f"Error in send_due_reminders: {e}")
+    if claimed_total:
+        stats = broadcaster.stats
+        elapsed = time.monotonic() - started
+        total = sum(stats[k] for k in ("sent", "blocked", "not_found", "failed", "transient"))
+        logger.info(
+            f"Daqiqalik eslatmalar: claimed={claimed_total}, {total} ta, {elapsed:.1f} s, "
+            f"{total / max(elapsed, 0.001):.1f} xabar/s, sent={stats['sent']}, blocked={stats['blocked']}, "
+            f"not_found={stats['not_found']}, failed={stats['failed']}, transient={stats['transient']}, "
+            f"retried={stats['retried']}"
+        )
+
+
+def _timed(job: str, func):
+    """Vazifa davomiyligini scheduler_job_seconds metrikasiga yozish"""
+    async def run(*args):
+        async with observe_job(job):
+            return await func(*args)
+    return run
 
 
 def setup_scheduler(bot: Bot):
     """
-    Sets up the scheduler to send qazo reminders daily at 20:00 Tashkent time.
+    Sets up the scheduler: per-user qazo reminders are checked every minute, so each user
+    gets the reminder at their own (or evenly spread default) time instead of one daily spike.
     """
     scheduler = AsyncIOScheduler(timezone="Asia/Tashkent")
     scheduler.add_job(
-        send_qazo_reminder,
+        _timed("send_due_reminders", send_due_reminders),
         trigger="cron",
-        hour=22,
-        minute=10,
+        second=0,
         args=[bot],
-        misfire_grace_time=60
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=30
+    )
+    # Har kuni oylik namoz vaqtlari jadvalini tekshirish: oy boshida yuklanadi, aladhan bermagan
+    # (offline hisob bilan to'ldirilgan) shaharlar keyingi kunlarda qayta so'raladi
+    scheduler.add_job(
+        _timed("ensure_month_prayer_times", ensure_month_prayer_times),
+        trigger="cron",
+        hour=0,
+        minute=0,
+        misfire_grace_time=3600
+    )
+    # Yarim tundan keyin barcha shaharlar uchun namoz vaqtlari keshini to'ldirish
+    scheduler.add_job(
+        _timed("prewarm_prayer_times", prewarm_prayer_times),
+        trigger="cron",
+        hour=0,
+        minute=1,
+        misfire_grace_time=600
+    )
+    # Muddati o'tgan FSM holatlarini tozalash
+    scheduler.add_job(
+        _timed("delete_expired_fsm_states", delete_expired_fsm_states),
+        trigger="interval",
+        minutes=10,
+        max_instances=1,
+        coalesce=True
+    )
+    # Takroriy update larni aniqlash jadvalidan eski id larni o'chirish
+    scheduler.add_job(
+        _timed("delete_old_update_ids", delete_old_update_ids),
+        trigger="interval",
+        hours=1,
+        max_instances=1,
+        coalesce=True
     )
     scheduler.start()
+    return scheduler
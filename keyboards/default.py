@@ -29,7 +29,10 @@ def admin_menu(is_main_admin: bool = False):
         [
             InlineKeyboardButton(text="📋 Kanallar ro‘yxati", callback_data="admin_list_channels"),
         ],
-        [InlineKeyboardButton(text="➕ FAQ qo‘shish", callback_data="admin_add_faq")]
+        [
+            InlineKeyboardButton(text="➕ FAQ qo‘shish", callback_data="admin_add_faq"),
+            InlineKeyboardButton(text="📬 Yuborishlar holati", callback_data="admin_broadcast_jobs")
+        ]
     ]
     if is_main_admin:
         keyboard[2].append(InlineKeyboardButton(text="👥 Adminlarni ko‘rish", callback_data="admin_list_admins"))
@@ -39,6 +42,20 @@ def admin_menu(is_main_admin: bool = False):
         ])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+def broadcast_jobs_menu(jobs):
+    keyboard = []
+    for job in jobs:
+        if job["status"] == "running":
+            toggle = InlineKeyboardButton(text=f"⏸ #{job['id']}", callback_data=f"bjob_pause_{job['id']}")
+        else:
+            toggle = InlineKeyboardButton(text=f"▶️ #{job['id']}", callback_data=f"bjob_resume_{job['id']}")
+        keyboard.append([
+            toggle,
+            InlineKeyboardButton(text=f"✖️ Bekor #{job['id']}", callback_data=f"bjob_cancel_{job['id']}")
+        ])
+    keyboard.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_menu")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
 def back_button_only():
     keyboard = [
         [InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_menu")]
@@ -60,6 +77,19 @@ def qazo_menu(counts):
     keyboard.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_main_menu")])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+def qazo_reminder_menu(counts):
+    prayer_names = ["bomdod", "peshin", "asr", "shom", "xufton", "vitr"]
+    keyboard = []
+    for prayer in prayer_names:
+        keyboard.append([InlineKeyboardButton(text=prayer.capitalize(), callback_data="noop")])
+        keyboard.append([
+            InlineKeyboardButton(text="➖", callback_data=f"dec_{prayer}"),
+            InlineKeyboardButton(text=str(counts.get(prayer, 0)), callback_data="noop"),
+            InlineKeyboardButton(text="➕", callback_data=f"inc_{prayer}")
+        ])
+    keyboard.append([InlineKeyboardButton(text="⬅️ Menyuga qaytish", callback_data="back_to_menu")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
 def qazo_hisoblash_menu():
     keyboard = [
         [InlineKeyboardButton(text="❗ Ha, 1 yildan oshli", callback_data="range_years")],
@@ -98,14 +128,31 @@ def check_subscription_menu(channels=None):
          [InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_main_menu")]]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
-def faq_menu(faqs):
+def faq_menu(faqs, has_prev=False, has_next=False):
     keyboard = [
         [InlineKeyboardButton(text=faq["question"], callback_data=f"faq_answer_{faq['id']}")]
         for faq in faqs
     ]
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton(text="⬅️ Oldingi", callback_data=f"faq_page_p_{faqs[0]['id']}"))
+    if has_next:
+        nav.append(InlineKeyboardButton(text="Keyingi ➡️", callback_data=f"faq_page_n_{faqs[-1]['id']}"))
+    if nav:
+        keyboard.append(nav)
+    keyboard.append([InlineKeyboardButton(text="🔍 Qidirish", callback_data="faq_search")])
     keyboard.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_main_menu")])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
+def faq_search_menu(faqs):
+    keyboard = [
+        [InlineKeyboardButton(text=faq["question"], callback_data=f"faq_answer_{faq['id']}")]
+        for faq in faqs
+    ]
+    keyboard.append([InlineKeyboardButton(text="🔍 Yana qidirish", callback_data="faq_search")])
+    keyboard.append([InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_faq_list")])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
 def back_to_faq_menu():
     keyboard = [
         [InlineKeyboardButton(text="🔙 Orqaga", callback_data="back_to_faq_list")]
@@ -6,14 +6,27 @@ import sys
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler
 from aiohttp import web
 
-from config import BOT_TOKEN, RAILWAY_ENVIRONMENT, PORT, WEBHOOK_URL, WEBHOOK_PATH
+from config import BOT_TOKEN, RAILWAY_ENVIRONMENT, PORT, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_MODE
 from database.db import init_db, close_db
-from handlers import start, qazo, prayer_times, faq, admin
+from database.fsm_storage import create_storage, FSMReadCacheMiddleware
+from database.qazo_buffer import start_qazo_buffer, stop_qazo_buffer, buffer_stats
+from handlers import start, qazo, prayer_times, faq, admin, reminder
 from handlers.check_subs import router as check_subs_router
+from handlers.channel_members import router as channel_members_router
+from handlers.scheduler import setup_scheduler
+from utils.broadcast_jobs import resume_broadcast_jobs
+from utils.namoz_parser import init_session, close_session, prewarm_prayer_times, get_cache_stats, \
+    ensure_month_prayer_times
+from utils.prayer_calc import build_timetable
+from utils.loop_watchdog import start_loop_watchdog, stop_loop_watchdog, get_lag_stats
+from utils.metrics import setup_metrics, setup_session_metrics, metrics_handler
+from utils.render import render_stats
+from utils.subscription import subscription_stats
+from utils.update_dedupe import UpdateDedupeMiddleware, dedupe_stats
+from utils.update_queue import handle_webhook, start_update_queue, stop_update_queue, get_queue_stats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,6 +41,61 @@ logger = logging.getLogger(__name__)
 # Global o'zgaruvchilar
 bot: Bot = None
 dp: Dispatcher = None
+scheduler = None
+warm_task: asyncio.Task = None
+
+
+def build_dispatcher(storage=None) -> Dispatcher:
+    """Dispatcher, middleware va barcha routerlarni yig'ish (benchmarks/ ham shundan foydalanadi)"""
+    storage = storage or create_storage()
+    dispatcher = Dispatcher(storage=storage)
+    dispatcher.update.outer_middleware(UpdateDedupeMiddleware())
+    dispatcher.update.outer_middleware(FSMReadCacheMiddleware())
+    # Prometheus: har bir router handleri vaqti
+    setup_metrics(dispatcher)
+    logger.info(f"Dispatcher va {type(storage).__name__} sozlandi")
+
+    # Handlerlarni ro'yxatdan o'tkazish
+    dispatcher.include_router(check_subs_router)
+    logger.info("check_subs_router qo'shildi")
+    dispatcher.include_router(channel_members_router)
+    logger.info("channel_members_router qo'shildi")
+
+    # Eski handler registration usulini yangi router usuli bilan almashtirish
+    if hasattr(start, 'router'):
+        dispatcher.include_router(start.router)
+    else:
+        start.register_handlers(dispatcher)
+    logger.info("Start handlerlari ro'yxatdan o'tdi")
+
+    if hasattr(qazo, 'router'):
+        dispatcher.include_router(qazo.router)
+    else:
+        qazo.register_handlers(dispatcher)
+    logger.info("Qazo handlerlari ro'yxatdan o'tdi")
+
+    if hasattr(prayer_times, 'router'):
+        dispatcher.include_router(prayer_times.router)
+    else:
+        prayer_times.register_handlers(dispatcher)
+    logger.info("Prayer times handlerlari ro'yxatdan o'tdi")
+
+    dispatcher.include_router(reminder.router)
+    logger.info("reminder_router qo'shildi")
+
+    if hasattr(faq, 'router'):
+        dispatcher.include_router(faq.router)
+    else:
+        faq.register_handlers(dispatcher)
+    logger.info("FAQ handlerlari ro'yxatdan o'tdi")
+
+    if hasattr(admin, 'router'):
+        dispatcher.include_router(admin.router)
+    else:
+        admin.register_handlers(dispatcher)
+    logger.info("Admin handlerlari ro'yxatdan o'tdi")
+
+    return dispatcher
 
 
 async def setup_bot():
@@ -40,50 +108,16 @@ async def setup_bot():
 
         logger.info("Bot obyekti yaratildi")
 
-        # Dispatcher va Storage
-        storage = MemoryStorage()
-        dp = Dispatcher(storage=storage)
-        logger.info("Dispatcher va MemoryStorage sozlandi")
+        # Dispatcher, storage va handlerlar
+        dp = build_dispatcher()
 
         # Ma'lumotlar bazasini ishga tushirish
         logger.info("PostgreSQL ma'lumotlar bazasi ishga tushirilmoqda")
         await init_db()
         logger.info("Ma'lumotlar bazasi muvaffaqiyatli ulandi")
 
-        # Handlerlarni ro'yxatdan o'tkazish
-        dp.include_router(check_subs_router)
-        logger.info("check_subs_router qo'shildi")
-
-        # Eski handler registration usulini yangi router usuli bilan almashtirish
-        if hasattr(start, 'router'):
-            dp.include_router(start.router)
-        else:
-            start.register_handlers(dp)
-        logger.info("Start handlerlari ro'yxatdan o'tdi")
-
-        if hasattr(qazo, 'router'):
-            dp.include_router(qazo.router)
-        else:
-            qazo.register_handlers(dp)
-        logger.info("Qazo handlerlari ro'yxatdan o'tdi")
-
-        if hasattr(prayer_times, 'router'):
-            dp.include_router(prayer_times.router)
-        else:
-            prayer_times.register_handlers(dp)
-        logger.info("Prayer times handlerlari ro'yxatdan o'tdi")
-
-        if hasattr(faq, 'router'):
-            dp.include_router(faq.router)
-        else:
-            faq.register_handlers(dp)
-        logger.info("FAQ handlerlari ro'yxatdan o'tdi")
-
-        if hasattr(admin, 'router'):
-            dp.include_router(admin.router)
-        else:
-            admin.register_handlers(dp)
-        logger.info("Admin handlerlari ro'yxatdan o'tdi")
+        # Prometheus: Bot API so'rovlari vaqti
+        setup_session_metrics(bot)
 
         return True
 
@@ -94,12 +128,38 @@ async def setup_bot():
 
 async def on_startup():
     """Bot ishga tushganda"""
+    global scheduler, warm_task
     logger.info("Bot ishga tushmoqda...")
 
+    # Bloklovchi chaqiruvlarni aniqlash uchun event loop kechikishini kuzatish
+    start_loop_watchdog()
+
+    # Namoz vaqtlari uchun umumiy HTTP sessiya, offline jadval va bugungi kesh
+    await init_session()
+    build_timetable()
+
+    async def warm_prayer_times():
+        await ensure_month_prayer_times()
+        await prewarm_prayer_times()
+
+    # Havola saqlanadi: aks holda vazifa GC tomonidan yig'ilishi mumkin; on_shutdown da bekor qilinadi
+    warm_task = asyncio.create_task(warm_prayer_times())
+
+    # Qazo ➕/➖ yozish buferi
+    start_qazo_buffer()
+
+    # Tugallanmagan ommaviy xabar yuborishlarni davom ettirish
+    await resume_broadcast_jobs(bot)
+
+    # Rejalashtirilgan vazifalar (eslatmalar, kesh yangilash)
+    scheduler = setup_scheduler(bot)
+    logger.info("Scheduler ishga tushdi")
+
     # Webhook o'rnatish (production uchun)
     if RAILWAY_ENVIRONMENT == 'production' and WEBHOOK_URL:
         webhook_url = f"{WEBHOOK_URL}{WEBHOOK_PATH}"
-        await bot.set_webhook(webhook_url)
+        # chat_member yangilanishlari faqat aniq so'ralganda keladi
+        await bot.set_webhook(webhook_url, allowed_updates=dp.resolve_used_update_types())
         logger.info(f"Webhook o'rnatildi: {webhook_url}")
     else:
         # Webhookni o'chirish (development uchun)
@@ -111,6 +171,24 @@ async def on_shutdown():
     """Bot to'xtaganda"""
     logger.info("Bot to'xtatilmoqda...")
 
+    if scheduler and scheduler.running:
+        scheduler.shutdown(wait=False)
+
+    stop_loop_watchdog()
+
+    if warm_task and not warm_task.done():
+        warm_task.cancel()
+
+    # Namoz vaqtlari HTTP sessiyasini yopish
+    await close_session()
+
+    # Yozilmagan qazo o'zgarishlarini bazaga yozish
+    await stop_qazo_buffer()
+
+    # FSM storage (Redis bo'lsa ulanishni yopadi)
+    if dp:
+        await dp.storage.close()
+
     # Ma'lumotlar bazasini yopish
     await close_db()
 
@@ -126,12 +204,35 @@ def create_app():
 
     # Health check endpoint
     async def health_check(request):
-        return web.json_response({"status": "ok", "bot": "running"})
+        return web.json_response({
+            "status": "ok",
+            "bot": "running",
+            "prayer_times_cache": get_cache_stats(),
+            "subscription_cache": subscription_stats,
+            "qazo_buffer": buffer_stats,
+            "menu_render": render_stats,
+            "webhook_queue": get_queue_stats(),
+            "update_dedupe": dedupe_stats,
+            "event_loop_lag": get_lag_stats()
+        })
 
     app.router.add_get('/health', health_check)
+    app.router.add_get('/metrics', metrics_handler)
 
     # Webhook handler (production uchun)
-    if RAILWAY_ENVIRONMENT == 'production':
+    if RAILWAY_ENVIRONMENT == 'production' and WEBHOOK_MODE == 'queue':
+        # Telegram ga darhol 200 qaytariladi, update lar navbatdan ishlanadi
+        app.router.add_post(WEBHOOK_PATH, handle_webhook)
+
+        async def start_queue(app):
+            start_update_queue(dp, bot)
+
+        async def stop_queue(app):
+            await stop_update_queue()
+
+        app.on_startup.append(start_queue)
+        app.on_shutdown.append(stop_queue)
+    elif RAILWAY_ENVIRONMENT == 'production':
         webhook_requests_handler = SimpleRequestHandler(
             dispatcher=dp,
             bot=bot,
@@ -186,7 +287,7 @@ async def main():
         else:
             # Development: polling rejimi
             logger.info("Development rejimida ishga tushirilmoqda (polling)")
-            await dp.start_polling(bot, skip_updates=True)
+            await dp.start_polling(bot, skip_updates=True, allowed_updates=dp.resolve_used_update_types())
 
     except Exception as e:
         logger.error(f"Dastur ishga tushirishda xato: {e}")
@@ -19,4 +19,7 @@ class QazoEditState(StatesGroup):
 
 class FaqStates(StatesGroup):
     waiting_for_question = State()
-    waiting_for_answer = State()
\ No newline at end of file
+    waiting_for_answer = State()
+
+class FaqSearchState(StatesGroup):
+    waiting_for_query = State()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# config.py majburiy o'zgaruvchilarni talab qiladi; testlar haqiqiy .env siz ishlaydi
+os.environ.setdefault("BOT_TOKEN", "123456:test")
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.setdefault("DATABASE_URL", "postgresql://bot@localhost/qazo_test")
+os.environ.setdefault("PRAYER_TIMES_SOURCE", "local")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
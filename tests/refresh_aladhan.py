@@ -0,0 +1,42 @@
+"""
+tests/data/aladhan_timings.json ni aladhan dan qayta yozish (tarmoq kerak).
+
+Bot bilan aynan bir xil parametrlar (utils.namoz_parser._api_params) ishlatiladi; testlar esa
+faqat saqlangan faylni o'qiydi.
+
+    python -m tests.refresh_aladhan
+"""
+import json
+import os
+import sys
+import urllib.parse
+import urllib.request
+
+os.environ.setdefault("BOT_TOKEN", "123456:test")
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.setdefault("DATABASE_URL", "postgresql://bot@localhost/qazo_test")
+
+from tests.test_prayer_calc import CASES, FIXTURE_PATH, fixture_key  # noqa: E402
+from utils.namoz_parser import API_URL, _api_params  # noqa: E402
+
+
+def fetch_timings(city: str, day) -> dict:
+    url = f"{API_URL}/{day.strftime('%d-%m-%Y')}?{urllib.parse.urlencode(_api_params(city))}"
+    with urllib.request.urlopen(url, timeout=10) as response:
+        data = json.load(response)["data"]
+    return {"timings": data["timings"], "method": data["meta"]["method"]}
+
+
+def main():
+    saved = {}
+    for city, day in CASES:
+        saved[fixture_key(city, day)] = fetch_timings(city, day)
+        print(f"{city} {day}: {saved[fixture_key(city, day)]['method'].get('name')}")
+    os.makedirs(os.path.dirname(FIXTURE_PATH), exist_ok=True)
+    with open(FIXTURE_PATH, "w", encoding="utf-8") as f:
+        json.dump(saved, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f"Saqlandi: {FIXTURE_PATH} ({len(saved)} ta javob)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
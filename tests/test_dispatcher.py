@@ -0,0 +1,49 @@
+"""
+main.build_dispatcher() orqali haqiqiy routerlar/middleware larga update yuborish (tarmoqsiz).
+
+Bot API benchmarks.fake_session.FakeSession bilan almashtiriladi, FSM xotirada saqlanadi.
+PostgreSQL bo'lmasa db funksiyalari standart qiymat qaytaradi - handlerlar baribir javob berishi kerak.
+"""
+import asyncio
+
+import pytest
+from aiogram import Bot
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from benchmarks.fake_session import FakeSession
+from benchmarks.updates import message_update, callback_update
+from config import BOT_TOKEN, RENDER_DEBOUNCE_MS
+from main import build_dispatcher
+
+USER_ID = 9_000_000_001
+
+
+@pytest.fixture(scope="module")
+def dp():
+    # Routerlar modul darajasida, ularni faqat bitta Dispatcher ga ulash mumkin
+    return build_dispatcher(storage=MemoryStorage())
+
+
+def _feed(dp, *updates) -> FakeSession:
+    async def run():
+        session = FakeSession()
+        bot = Bot(token=BOT_TOKEN, session=session)
+        for update in updates:
+            await dp.feed_raw_update(bot, update)
+        # Kechiktirilgan menyu tahrirlari tugashini kutish
+        await asyncio.sleep(RENDER_DEBOUNCE_MS / 1000 + 0.2)
+        return session
+
+    return asyncio.run(run())
+
+
+def test_start_command_replies(dp):
+    session = _feed(dp, message_update(USER_ID, "/start"))
+    assert session.calls["SendMessage"] == 1
+
+
+def test_inc_callback_answers_and_refreshes_menu(dp):
+    session = _feed(dp, callback_update(USER_ID, "inc_bomdod"), callback_update(USER_ID, "inc_bomdod"))
+    assert session.calls["AnswerCallbackQuery"] == 2
+    # Ketma-ket bosishlar bitta menyu tahririga yig'iladi
+    assert session.calls["EditMessageText"] == 1
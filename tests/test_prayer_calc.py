@@ -0,0 +1,70 @@
+"""
+Offline hisob (utils/prayer_calc.py) ni saqlangan aladhan javoblari bilan solishtirish.
+
+Javoblar tests/data/aladhan_timings.json da (bot bilan bir xil parametrlar bilan olingan);
+test tarmoqqa chiqmaydi. Faylni yangilash: python -m tests.refresh_aladhan
+
+    python -m pytest tests/test_prayer_calc.py
+"""
+import json
+import os
+from datetime import date, datetime, timezone
+from itertools import product
+
+import pytest
+
+from utils.prayer_calc import PRAYER_KEYS, get_local_prayer_times, today_local
+
+CITIES = ["Toshkent", "Samarqand", "Buxoro", "Andijon", "Termiz", "Urganch"]
+DAYS = [date(2025, 1, 15), date(2025, 6, 21)]
+CASES = list(product(CITIES, DAYS))
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "data", "aladhan_timings.json")
+TOLERANCE_MINUTES = 2
+
+
+def fixture_key(city: str, day: date) -> str:
+    return f"{city}|{day.isoformat()}"
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value[:5].split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _saved_timings(city: str, day: date) -> dict:
+    if not os.path.exists(FIXTURE_PATH):
+        pytest.skip(f"{FIXTURE_PATH} yo'q: python -m tests.refresh_aladhan bilan yozib oling")
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        saved = json.load(f)
+    return saved[fixture_key(city, day)]["timings"]
+
+
+@pytest.mark.parametrize("city,day", CASES)
+def test_local_engine_matches_api(city, day):
+    api = _saved_timings(city, day)
+    local = get_local_prayer_times(city, day)
+
+    for key in PRAYER_KEYS:
+        diff = abs(_minutes(api[key]) - _minutes(local[key]))
+        assert diff <= TOLERANCE_MINUTES, f"{city} {day} {key}: api={api[key]} local={local[key]}"
+
+
+def test_local_engine_order():
+    times = get_local_prayer_times("Toshkent", date(2025, 3, 20))
+    minutes = [_minutes(times[key]) for key in PRAYER_KEYS]
+    assert minutes == sorted(minutes)
+
+
+def test_unknown_city():
+    assert get_local_prayer_times("Nukus", date(2025, 3, 20)) is None
+
+
+def test_today_local_is_tashkent_date(monkeypatch):
+    # 2025-01-01 20:30 UTC - Toshkentda allaqachon 2-yanvar
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 1, 1, 20, 30, tzinfo=timezone.utc).astimezone(tz)
+
+    monkeypatch.setattr("utils.prayer_calc.datetime", FakeDatetime)
+    assert today_local() == date(2025, 1, 2)
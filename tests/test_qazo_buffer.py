@@ -0,0 +1,102 @@
+"""
+database/qazo_buffer.py: flush bilan parallel o'qish, yozilmagan flush va 0 chegarasi (bazasiz).
+"""
+import asyncio
+
+import pytest
+
+import database.qazo_buffer as qb
+
+USER_ID = 42
+
+
+class FakeDb:
+    """apply_qazo_deltas/get_user_qazo o'rnini bosuvchi: commit dan keyin ham ulanish biroz band turadi"""
+
+    def __init__(self, fail: bool = False):
+        self.counts = {prayer: 0 for prayer in qb.QAZO_PRAYERS}
+        self.fail = fail
+
+    async def apply_qazo_deltas(self, deltas: dict) -> bool:
+        await asyncio.sleep(0.005)
+        if self.fail:
+            return False
+        for (_, prayer), delta in deltas.items():
+            self.counts[prayer] = max(self.counts[prayer] + delta, 0)
+        # commit bo'ldi, lekin ulanish hali pool ga qaytmagan
+        await asyncio.sleep(0.01)
+        return True
+
+    async def get_user_qazo(self, user_id: int) -> dict:
+        await asyncio.sleep(0.004)
+        counts = dict(self.counts)
+        await asyncio.sleep(0.004)
+        return counts
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDb()
+    monkeypatch.setattr(qb, "apply_qazo_deltas", fake.apply_qazo_deltas)
+    monkeypatch.setattr(qb, "get_user_qazo", fake.get_user_qazo)
+    monkeypatch.setattr(qb, "_pending", {})
+    monkeypatch.setattr(qb, "_flushing", {})
+    # Lock/Event har bir asyncio.run uchun yangi bo'lishi kerak
+    monkeypatch.setattr(qb, "_flush_lock", asyncio.Lock())
+    monkeypatch.setattr(qb, "_flush_idle", asyncio.Event())
+    qb._flush_idle.set()
+    return fake
+
+
+def test_read_during_flush_counts_each_delta_once(db):
+    async def run():
+        wrong = []
+        for i in range(1, 61):
+            qb.add_qazo_delta(USER_ID, "bomdod", 1)
+            flush = asyncio.create_task(qb.flush_qazo_buffer())
+            # O'qish flush ning turli bosqichlariga to'g'ri keladi
+            await asyncio.sleep(0.001 * (i % 20))
+            counts = await qb.get_user_qazo_buffered(USER_ID)
+            if counts["bomdod"] != i:
+                wrong.append((i, counts["bomdod"]))
+            await flush
+        return wrong
+
+    assert asyncio.run(run()) == []
+    assert db.counts["bomdod"] == 60
+
+
+def test_failed_flush_puts_deltas_back(db):
+    db.fail = True
+
+    async def run():
+        qb.add_qazo_delta(USER_ID, "asr", 3)
+        await qb.flush_qazo_buffer()
+        assert qb._pending == {(USER_ID, "asr"): 3}
+        assert qb._flushing == {}
+        assert (await qb.get_user_qazo_buffered(USER_ID))["asr"] == 3
+
+        db.fail = False
+        await qb.flush_qazo_buffer()
+        assert qb._pending == {}
+        assert (await qb.get_user_qazo_buffered(USER_ID))["asr"] == 3
+
+    asyncio.run(run())
+    assert db.counts["asr"] == 3
+
+
+def test_zero_floor(db):
+    async def run():
+        qb.add_qazo_delta(USER_ID, "shom", -2)
+        assert (await qb.get_user_qazo_buffered(USER_ID))["shom"] == 0
+        await qb.flush_qazo_buffer()
+        assert (await qb.get_user_qazo_buffered(USER_ID))["shom"] == 0
+
+    asyncio.run(run())
+    assert db.counts["shom"] == 0
+
+
+def test_opposite_taps_cancel_out(db):
+    qb.add_qazo_delta(USER_ID, "vitr", 1)
+    qb.add_qazo_delta(USER_ID, "vitr", -1)
+    assert qb.pending_qazo_deltas(USER_ID) == {}
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Union, Iterable, AsyncIterable
+
+from aiogram.exceptions import (
+    TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest, TelegramNotFound,
+    TelegramNetworkError, TelegramServerError
+)
+
+from config import BROADCAST_RATE, BROADCAST_CONCURRENCY, BROADCAST_MAX_ATTEMPTS
+from utils.metrics import BROADCAST_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Umumiy tezlik cheklovchi: soniyasiga `rate` ta xabar, `capacity` gacha portlash"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Telegram retry_after qaytarganda barcha yuboruvchilarni to'xtatish"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def new_stats() -> dict:
+    return {"sent": 0, "blocked": 0, "not_found": 0, "transient": 0, "failed": 0, "retried": 0}
+
+
+class Broadcaster:
+    """
+    Ko'p foydalanuvchiga xabar yuborish: cheklangan parallel yuboruvchilar,
+    umumiy token bucket, retry_after va vaqtinchalik xatolarda qayta urinish.
+    """
+
+    def __init__(self, rate: float = BROADCAST_RATE, concurrency: int = BROADCAST_CONCURRENCY,
+                 max_attempts: int = BROADCAST_MAX_ATTEMPTS):
+        self.bucket = TokenBucket(rate)
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.stats = new_stats()
+
+    async def send_one(self, user_id, send: Callable[[Any], Awaitable]) -> str:
+        """
+        Bitta qabul qiluvchiga yuborish; natija holatini qaytaradi.
+        retry_after urinish hisoblanmaydi: bucket to'xtatiladi va xabar pauzadan keyin qayta yuboriladi;
+        max_attempts faqat tarmoq/5xx xatolariga qo'llanadi.
+        """
+        attempt = 0
+        while attempt < self.max_attempts:
+            await self.bucket.acquire()
+            try:
+                await send(user_id)
+                return "sent"
+            except TelegramRetryAfter as e:
+                self.bucket.pause(e.retry_after)
+                self.stats["retried"] += 1
+                logger.warning(f"Flood limit: retry_after={e.retry_after}s, user_id={user_id}")
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramNotFound:
+                return "not_found"
+            except TelegramBadRequest as e:
+                if "chat not found" in str(e).lower() or "user not found" in str(e).lower():
+                    return "not_found"
+                logger.warning(f"Xabar yuborishda xato: user_id={user_id}, {e}")
+                return "failed"
+            except (TelegramNetworkError, TelegramServerError, asyncio.TimeoutError) as e:
+                attempt += 1
+                self.stats["retried"] += 1
+                logger.warning(f"Vaqtinchalik xato: user_id={user_id}, urinish={attempt}, {e}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+            except Exception as e:
+                logger.warning(f"Xabar yuborishda xato: user_id={user_id}, {e}")
+                return "failed"
+        return "transient"
+
+    async def run(self, user_ids: Union[Iterable, AsyncIterable], send: Callable[[Any], Awaitable],
+                  on_progress: Optional[Callable[[dict], Awaitable]] = None,
+                  progress_interval: float = 3.0,
+                  on_result: Optional[Callable[[Any, str], None]] = None) -> dict:
+        """
+        user_ids elementlari (odatda user_id, lekin istalgan obyekt bo'lishi mumkin) send() ga uzatiladi.
+        Ro'yxat ham, async generator ham qabul qilinadi - generator navbat orqali asta-sekin o'qiladi.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                user_id = await queue.get()
+                try:
+                    if user_id is None:
+                        return
+                    status = await self.send_one(user_id, send)
+                    self.stats[status] += 1
+                    BROADCAST_MESSAGES.labels(status).inc()
+                    if on_result:
+                        on_result(user_id, status)
+                finally:
+                    queue.task_done()
+
+        async def report():
+            while True:
+                await asyncio.sleep(progress_interval)
+                try:
+                    await on_progress(dict(self.stats))
+                except Exception as e:
+                    logger.warning(f"Progress xabarini yangilashda xato: {e}")
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(report()) if on_progress else None
+        try:
+            if hasattr(user_ids, "__aiter__"):
+                async for user_id in user_ids:
+                    await queue.put(user_id)
+            else:
+                for user_id in user_ids:
+                    await queue.put(user_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            if reporter:
+                reporter.cancel()
+        return dict(self.stats)
+
+
+def format_stats(stats: dict) -> str:
+    return (
+        f"✅ Yuborildi: {stats['sent']}\n"
+        f"🚫 Bloklagan: {stats['blocked']}\n"
+        f"❔ Topilmadi: {stats['not_found']}\n"
+        f"⚠️ Xato: {stats['failed'] + stats['transient']}"
+    )
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import uuid
+from typing import Dict
+
+from aiogram import Bot
+
+from config import BROADCAST_BATCH_SIZE, BROADCAST_RATE, BROADCAST_RETRY_PASSES
+from database.db import (
+    is_admin, get_broadcast_job, get_broadcast_jobs, claim_broadcast_job, get_broadcast_batch,
+    record_broadcast_batch, set_broadcast_job_status, restart_broadcast_pass
+)
+from utils.broadcast import Broadcaster, format_stats
+
+logger = logging.getLogger(__name__)
+
+# Shu jarayonning identifikatori: ishni bir vaqtda faqat bitta replika yuboradi
+INSTANCE_ID = uuid.uuid4().hex
+# Band qilish muddati bir bo'lakni yuborish vaqtidan (retry_after kutishlari bilan) ancha uzun bo'lishi kerak;
+# bo'lak davomida ham har LEASE_SECONDS / 3 da yangilanadi
+LEASE_SECONDS = max(120, int(4 * BROADCAST_BATCH_SIZE / BROADCAST_RATE))
+
+_running: Dict[int, asyncio.Task] = {}
+
+
+async def _update_progress(bot: Bot, job: dict, title: str):
+    if not job.get("progress_chat_id"):
+        return
+    try:
+        await bot.edit_message_text(
+            f"{title}\n\n{format_stats({**job, 'transient': 0})}",
+            chat_id=job["progress_chat_id"],
+            message_id=job["progress_message_id"]
+        )
+    except Exception as e:
+        logger.warning(f"Progress xabarini yangilashda xato: job_id={job['id']}, {e}")
+
+
+async def run_broadcast_job(bot: Bot, job_id: int):
+    """Ishni kursordan boshlab bo'laklab yuborish; har bo'lakdan keyin holat va kursor bazaga yoziladi"""
+    broadcaster = Broadcaster()
+    try:
+        while True:
+            job = await get_broadcast_job(job_id)
+            if job is None or job["status"] != "running":
+                return
+            if not await claim_broadcast_job(job_id, INSTANCE_ID, LEASE_SECONDS):
+                logger.info(f"Broadcast ishi boshqa replikada: job_id={job_id}")
+                return
+
+            batch = await get_broadcast_batch(job_id, job["cursor_user_id"], BROADCAST_BATCH_SIZE)
+            if not batch and job["cursor_user_id"] and await restart_broadcast_pass(job_id, BROADCAST_RETRY_PASSES):
+                # Vaqtinchalik xato bilan qolganlar (natijasi yozilmagan) boshidan qayta olinadi
+                logger.info(f"Broadcast qayta o'tish: job_id={job_id}, pass={job['retry_passes'] + 1}")
+                continue
+            if not batch:
+                await set_broadcast_job_status(job_id, "done", ["running"])
+                job = await get_broadcast_job(job_id)
+                await _update_progress(bot, job, "✅ Xabar yuborish yakunlandi.")
+                logger.info(f"Broadcast yakunlandi: job_id={job_id}")
+                return
+
+            results = []
+            recipients = [user_id for user_id in batch if not await is_admin(user_id)]
+
+            async def send(user_id: int):
+                await bot.send_message(user_id, job["text"])
+
+            async def renew_lease(stats: dict):
+                await claim_broadcast_job(job_id, INSTANCE_ID, LEASE_SECONDS)
+
+            # Oxirgi o'tishgacha "transient" natijalar yozilmaydi - keyingi o'tishda qayta yuboriladi
+            final_pass = job["retry_passes"] >= BROADCAST_RETRY_PASSES
+
+            def on_result(user_id: int, status: str):
+                if status != "transient" or final_pass:
+                    results.append((user_id, status))
+
+            await broadcaster.run(recipients, send, on_progress=renew_lease, progress_interval=LEASE_SECONDS / 3,
+                                  on_result=on_result)
+            if not await record_broadcast_batch(job_id, batch[-1], results):
+                # Natijalar saqlanmadi: davom etsak, shu bo'lak qayta yuborilib qoladi
+                await set_broadcast_job_status(job_id, "paused", ["running"])
+                logger.error(f"Broadcast natijalari yozilmadi, ish to'xtatildi: job_id={job_id}")
+                return
+
+            job = await get_broadcast_job(job_id)
+            await _update_progress(bot, job, "📣 Yuborilmoqda...")
+    except Exception as e:
+        logger.error(f"run_broadcast_job xato: job_id={job_id}, {e}")
+    finally:
+        _running.pop(job_id, None)
+
+
+def start_broadcast_job(bot: Bot, job_id: int):
+    task = _running.get(job_id)
+    if task is None or task.done():
+        _running[job_id] = asyncio.create_task(run_broadcast_job(bot, job_id))
+
+
+async def resume_broadcast_jobs(bot: Bot):
+    """Qayta ishga tushganda tugallanmagan ishlarni davom ettirish"""
+    jobs = await get_broadcast_jobs(["running"])
+    for job in jobs:
+        start_broadcast_job(bot, job["id"])
+    if jobs:
+        logger.info(f"Tugallanmagan broadcast ishlari davom ettirildi: {[job['id'] for job in jobs]}")
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from config import LOOP_LAG_INTERVAL_MS, LOOP_LAG_THRESHOLD_MS
+from utils.metrics import LOOP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+REPORT_INTERVAL = 60
+MAX_SAMPLES = 3000
+
+# Event loop qanchalik kechikib uyg'onayotgani (ms); oxirgi MAX_SAMPLES ta o'lchov
+_samples: deque = deque(maxlen=MAX_SAMPLES)
+_heartbeat: float = 0.0
+_task: Optional[asyncio.Task] = None
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+lag_stats = {"stalls": 0, "max_ms": 0.0}
+
+
+def _percentile(values: list, q: float) -> float:
+    return values[min(int(len(values) * q), len(values) - 1)] if values else 0.0
+
+
+def get_lag_stats() -> dict:
+    values = sorted(_samples)
+    return {
+        "p50_ms": round(_percentile(values, 0.50), 2),
+        "p95_ms": round(_percentile(values, 0.95), 2),
+        "p99_ms": round(_percentile(values, 0.99), 2),
+        **lag_stats,
+    }
+
+
+async def _measure_loop(interval: float):
+    global _heartbeat
+    last_report = time.monotonic()
+    while True:
+        started = time.monotonic()
+        _heartbeat = started
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        lag = max(now - started - interval, 0.0)
+        _samples.append(lag * 1000)
+        LOOP_LAG_SECONDS.observe(lag)
+        lag_stats["max_ms"] = round(max(lag_stats["max_ms"], lag * 1000), 2)
+        if now - last_report >= REPORT_INTERVAL:
+            last_report = now
+            logger.info(f"Event loop kechikishi: {get_lag_stats()}")
+
+
+def _watch_thread(loop_thread_id: int, interval: float, threshold: float):
+    """Alohida oqim: loop javob bermay qolsa, asosiy oqim stekini yozib olish (har bir to'xtashda bir marta)"""
+    reported_heartbeat = None
+    while not _stop.wait(interval):
+        heartbeat = _heartbeat
+        stalled = time.monotonic() - heartbeat - interval
+        if stalled < threshold or heartbeat == reported_heartbeat:
+            continue
+        reported_heartbeat = heartbeat
+        lag_stats["stalls"] += 1
+        frame = sys._current_frames().get(loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame else "stek topilmadi"
+        logger.warning(f"Event loop {stalled * 1000:.0f} ms dan beri band. Asosiy oqim steki:\n{stack}")
+
+
+def start_loop_watchdog(interval_ms: int = LOOP_LAG_INTERVAL_MS, threshold_ms: int = LOOP_LAG_THRESHOLD_MS):
+    global _task, _thread, _heartbeat
+    if _task is not None and not _task.done():
+        return
+    interval, threshold = interval_ms / 1000, threshold_ms / 1000
+    _heartbeat = time.monotonic()
+    _stop.clear()
+    _task = asyncio.create_task(_measure_loop(interval))
+    _thread = threading.Thread(target=_watch_thread, args=(threading.get_ident(), interval, threshold),
+                               name="loop-watchdog", daemon=True)
+    _thread.start()
+    logger.info(f"Event loop kuzatuvchisi ishga tushdi: threshold={threshold_ms} ms")
+
+
+def stop_loop_watchdog():
+    global _task, _thread
+    _stop.set()
+    if _task:
+        _task.cancel()
+        _task = None
+    _thread = None
@@ -0,0 +1,130 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Barcha metrikalar shu yerda; yozish arzon (perf_counter + observe), doimiy yoqilgan holda ishlatiladi
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Handler ishlash vaqti", ["event", "handler"])
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Handlerdagi xatolar", ["event", "handler"])
+TELEGRAM_SECONDS = Histogram("telegram_api_seconds", "Bot API so'rovlari vaqti", ["method"])
+TELEGRAM_ERRORS = Counter("telegram_api_errors_total", "Bot API xatolari", ["method", "error"])
+DB_ACQUIRE_SECONDS = Histogram("db_pool_acquire_seconds", "Pool dan ulanish olishni kutish vaqti",
+                               buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+DB_CALL_SECONDS = Histogram("db_call_seconds", "database/db.py funksiyalarining ulanishni ushlab turish vaqti",
+                            ["function"])
+DB_POOL_SIZE = Gauge("db_pool_size", "Pool dagi ulanishlar soni")
+DB_POOL_IDLE = Gauge("db_pool_idle", "Pool dagi bo'sh ulanishlar soni")
+PRAYER_API_SECONDS = Histogram("prayer_api_seconds", "aladhan so'rovlari vaqti", ["endpoint", "result"])
+BROADCAST_MESSAGES = Counter("broadcast_messages_total", "Ommaviy yuborilgan xabarlar", ["status"])
+SCHEDULER_JOB_SECONDS = Histogram("scheduler_job_seconds", "Rejalashtirilgan vazifalar vaqti", ["job"],
+                                  buckets=(.1, .5, 1, 5, 10, 30, 60, 300, 900, 1800))
+LOOP_LAG_SECONDS = Histogram("event_loop_lag_seconds", "Event loop kechikishi",
+                             buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5))
+
+_pool = None
+DB_POOL_SIZE.set_function(lambda: _pool.get_size() if _pool is not None else 0)
+DB_POOL_IDLE.set_function(lambda: _pool.get_idle_size() if _pool is not None else 0)
+
+
+class _TimedAcquire:
+    def __init__(self, pool, function: str):
+        self._context = pool.acquire()
+        self._function = function
+        self._acquired = 0.0
+
+    async def __aenter__(self):
+        started = time.perf_counter()
+        conn = await self._context.__aenter__()
+        self._acquired = time.perf_counter()
+        DB_ACQUIRE_SECONDS.observe(self._acquired - started)
+        return conn
+
+    async def __aexit__(self, *exc_info):
+        try:
+            return await self._context.__aexit__(*exc_info)
+        finally:
+            DB_CALL_SECONDS.labels(self._function).observe(time.perf_counter() - self._acquired)
+
+
+class TimedPool:
+    """asyncpg pool o'rami: acquire() kutish vaqti va label (chaqiruvchi funksiya) bo'yicha ushlab turish vaqti"""
+
+    def __init__(self, pool):
+        global _pool
+        self._pool = pool
+        _pool = pool
+
+    def acquire(self, *, label: str = "other"):
+        return _TimedAcquire(self._pool, label)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    def __init__(self, event: str):
+        self.event = event
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        if handler_object:
+            callback = handler_object.callback
+            name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+        else:
+            name = "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(self.event, name).inc()
+            raise
+        finally:
+            HANDLER_SECONDS.labels(self.event, name).observe(time.perf_counter() - started)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]) -> Response[TelegramType]:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            TELEGRAM_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def setup_metrics(dp: Dispatcher):
+    """Barcha routerlar handlerlarini o'lchash (main.build_dispatcher chaqiradi)"""
+    # Dispatcher dagi ichki middleware barcha ichki routerlar handlerlariga ham qo'llanadi
+    for event, observer in dp.observers.items():
+        if event not in ("update", "error"):
+            observer.middleware(HandlerMetricsMiddleware(event))
+
+
+def setup_session_metrics(bot: Bot):
+    """Bot API so'rovlari vaqtini o'lchash"""
+    bot.session.middleware(TelegramMetricsMiddleware())
+
+
+@asynccontextmanager
+async def observe_job(job: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SCHEDULER_JOB_SECONDS.labels(job).observe(time.perf_counter() - started)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
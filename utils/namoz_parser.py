@@ -1,28 +1,228 @@
-import requests
+import asyncio
+import calendar
 import json
 import logging
+import time
+from datetime import date, datetime
+from typing import Optional, Dict, Tuple
 
+import aiohttp
 
-def get_prayer_times(city="Tashkent"):
+from config import PRAYER_API_TIMEOUT, PRAYER_API_CONCURRENCY, PRAYER_TIMES_SOURCE
+from database.db import save_prayer_times, get_city_prayer_times, get_prayer_times_for_date, \
+    count_prayer_times_by_city
+from utils.metrics import PRAYER_API_SECONDS
+from utils.prayer_calc import get_local_prayer_times, get_local_month_rows, PRAYER_KEYS, today_local
+from utils.regions import regions
+
+API_URL = "https://api.aladhan.com/v1/timingsByCity"
+CALENDAR_URL = "https://api.aladhan.com/v1/calendarByCity/{year}/{month}"
+
+# Umumiy HTTP sessiya: keep-alive ulanishlar puli, on_startup/on_shutdown da ochiladi va yopiladi
+session: Optional[aiohttp.ClientSession] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+# (shahar, Toshkent sanasi) -> vaqtlar. Sana o'zgarganda (mahalliy yarim tun) eski yozuvlar eskiradi
+_cache: Dict[Tuple[str, date], dict] = {}
+_inflight: Dict[Tuple[str, date], asyncio.Task] = {}
+cache_stats = {"hits": 0, "misses": 0, "prewarmed": 0}
+
+
+async def init_session() -> aiohttp.ClientSession:
+    global session, _semaphore
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=PRAYER_API_CONCURRENCY,
+            keepalive_timeout=60,
+            ttl_dns_cache=300
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _semaphore = asyncio.Semaphore(PRAYER_API_CONCURRENCY)
+        logging.info("Namoz vaqtlari HTTP sessiyasi ochildi")
+    return session
+
+
+async def close_session():
+    global session
+    if session and not session.closed:
+        await session.close()
+        logging.info("Namoz vaqtlari HTTP sessiyasi yopildi")
+    session = None
+
+
+def all_cities() -> list:
+    # Ba'zi tumanlar bir nechta viloyatda takrorlanadi
+    return list(dict.fromkeys(city for cities in regions.values() for city in cities))
+
+
+def _evict_stale(today: date):
+    for key in [k for k in _cache if k[1] != today]:
+        del _cache[key]
+
+
+def get_cache_stats() -> dict:
+    return {**cache_stats, "size": len(_cache)}
+
+
+async def get_prayer_times(city="Tashkent"):
+    key = (city, today_local())
+    timings = _cache.get(key)
+    if timings is not None:
+        cache_stats["hits"] += 1
+        return timings
+    cache_stats["misses"] += 1
+
+    # Bir shahar uchun parallel so'rovlar bitta HTTP so'rovni kutadi
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(load_prayer_times(city))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    timings = await asyncio.shield(task)
+    if timings is not None:
+        _evict_stale(key[1])
+        _cache[key] = timings
+    return timings
+
+
+async def prewarm_prayer_times():
+    """Barcha shaharlar uchun bugungi vaqtlarni keshga yuklash"""
+    today = today_local()
+    _evict_stale(today)
+    for city, timings in (await get_prayer_times_for_date(today)).items():
+        _cache[(city, today)] = timings
+    cities = [city for city in all_cities() if (city, today) not in _cache]
+    results = await asyncio.gather(*(load_prayer_times(city) for city in cities))
+    loaded = 0
+    for city, timings in zip(cities, results):
+        if timings is not None:
+            _cache[(city, today)] = timings
+            loaded += 1
+    cache_stats["prewarmed"] += loaded
+    logging.info(f"Prayer times cache prewarmed: date={today}, loaded={loaded}, failed={len(cities) - loaded}")
+    return loaded
+
+
+async def load_prayer_times(city: str) -> Optional[dict]:
+    """Bugungi vaqtlarni olish: avval prayer_times jadvali, keyin aladhan yoki offline jadval"""
+    today = today_local()
+    timings = await get_city_prayer_times(city, today)
+    if timings is not None:
+        return timings
+    if PRAYER_TIMES_SOURCE == "local":
+        return get_local_prayer_times(city, today)
+    timings = await fetch_prayer_times(city)
+    if timings is None:
+        timings = get_local_prayer_times(city, today)
+        if timings is not None:
+            logging.warning(f"Prayer times served from offline timetable: city={city}")
+    return timings
+
+
+async def _get_json(url: str, params: dict, city: str) -> Optional[dict]:
+    started = time.perf_counter()
+    data = await _fetch_json(url, params, city)
+    endpoint = "calendar" if "calendarByCity" in url else "timings"
+    PRAYER_API_SECONDS.labels(endpoint, "ok" if data else "error").observe(time.perf_counter() - started)
+    return data
+
+
+async def _fetch_json(url: str, params: dict, city: str) -> Optional[dict]:
     try:
-        url = f"https://api.aladhan.com/v1/timingsByCity?city={city}&country=Uzbekistan"
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
+        http = await init_session()
+        # Bir vaqtda aladhan'ga boradigan so'rovlar soni cheklangan, timeout har bir so'rovga alohida
+        async with _semaphore:
+            async with http.get(url, params=params,
+                                timeout=aiohttp.ClientTimeout(total=PRAYER_API_TIMEOUT)) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
 
-        data = response.json()
         if data.get("code") != 200:
             logging.error(f"API error: city={city}, code={data.get('code')}, message={data.get('status')}")
             return None
-
-        timings = data["data"]["timings"]
-        logging.info(f"Prayer times fetched: city={city}")
-        return timings
+        return data
     except json.JSONDecodeError as e:
         logging.error(f"JSON decode error: city={city}, {e}")
         return None
-    except requests.RequestException as e:
+    except asyncio.TimeoutError:
+        logging.error(f"Request timeout: city={city}, timeout={PRAYER_API_TIMEOUT}s")
+        return None
+    except aiohttp.ClientError as e:
         logging.error(f"Request error: city={city}, {e}")
         return None
     except Exception as e:
         logging.error(f"Unexpected error in get_prayer_times: city={city}, {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+def _api_params(city: str) -> dict:
+    # method/school berilmaydi (asl so'rov kabi): aladhan joylashuvga eng yaqin usulni tanlaydi
+    return {"city": city, "country": "Uzbekistan"}
+
+
+async def fetch_prayer_times(city="Tashkent"):
+    data = await _get_json(API_URL, _api_params(city), city)
+    if data is None:
+        return None
+    timings = data["data"]["timings"]
+    logging.info(f"Prayer times fetched: city={city}")
+    return timings
+
+
+async def fetch_month_calendar(city: str, year: int, month: int) -> Optional[list]:
+    """aladhan calendar endpointidan bir oylik (city, date, fajr, ..., isha, "api") qatorlari"""
+    data = await _get_json(CALENDAR_URL.format(year=year, month=month), _api_params(city), city)
+    if data is None:
+        return None
+    try:
+        rows = []
+        for day in data["data"]:
+            # Vaqtlar "04:50 (+05)" ko'rinishida keladi
+            times = [datetime.strptime(day["timings"][key][:5], "%H:%M").time() for key in PRAYER_KEYS]
+            day_date = datetime.strptime(day["date"]["gregorian"]["date"], "%d-%m-%Y").date()
+            rows.append((city, day_date, *times, "api"))
+        return rows
+    except (KeyError, ValueError) as e:
+        logging.error(f"Calendar parse error: city={city}, {year}-{month:02d}, {e}")
+        return None
+
+
+async def load_month_prayer_times(year: int, month: int, cities: Optional[list] = None) -> int:
+    """Oylik jadvalni manbadan olib prayer_times jadvaliga bir martada yozish (cities - faqat shu shaharlar)"""
+    cities = cities or all_cities()
+    wanted = set(cities)
+    local_rows = [(*row, "local") for row in get_local_month_rows(year, month) if row[0] in wanted]
+    if PRAYER_TIMES_SOURCE == "local":
+        rows = local_rows
+    else:
+        results = await asyncio.gather(*(fetch_month_calendar(city, year, month) for city in cities))
+        rows = []
+        failed = set()
+        for city, city_rows in zip(cities, results):
+            if city_rows:
+                rows.extend(city_rows)
+            else:
+                failed.add(city)
+        # aladhan bermagan shaharlar offline hisobdan olinadi
+        rows.extend(row for row in local_rows if row[0] in failed)
+        if failed:
+            logging.warning(f"Calendar fetch failed, offline timetable used: cities={len(failed)}")
+    saved = await save_prayer_times(rows)
+    logging.info(f"Monthly prayer timetable loaded: {year}-{month:02d}, rows={saved}")
+    return saved
+
+
+async def ensure_month_prayer_times():
+    """
+    Joriy oy jadvali to'liq bo'lmagan shaharlarni yuklash. API rejimida offline hisobdan olingan
+    qatorlar hisobga olinmaydi, shuning uchun keyingi ishga tushishda aladhan qayta so'raladi.
+    """
+    today = today_local()
+    days = calendar.monthrange(today.year, today.month)[1]
+    start = today.replace(day=1)
+    end = date(today.year + (today.month == 12), today.month % 12 + 1, 1)
+    source = None if PRAYER_TIMES_SOURCE == "local" else "api"
+    counts = await count_prayer_times_by_city(start, end, source)
+    missing = [city for city in all_cities() if counts.get(city, 0) < days]
+    if missing:
+        await load_month_prayer_times(today.year, today.month, missing)
@@ -0,0 +1,121 @@
+import calendar
+import logging
+from datetime import date, datetime, time
+from typing import Optional, Dict
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from config import PRAYER_CALC_METHOD
+from utils.regions import coordinates
+
+# aladhan timingsByCity so'rovida method berilmaydi - u joylashuvga eng yaqin hisob usulini tanlaydi
+# (O'zbekiston uchun Tehron). Offline hisob shu usulni takrorlaydi; "maghrib": None - quyosh botishi.
+METHODS = {
+    "tehran": {"fajr": 17.7, "isha": 14.0, "maghrib": 4.5},
+    "mwl": {"fajr": 18.0, "isha": 17.0, "maghrib": None},
+    "isna": {"fajr": 15.0, "isha": 15.0, "maghrib": None},
+    "karachi": {"fajr": 18.0, "isha": 18.0, "maghrib": None},
+}
+ASR_SHADOW_FACTOR = 1  # Shofeiy asr (aladhan school=0, standart)
+SUNRISE_ALTITUDE = -0.833
+UTC_OFFSET = 5  # Asia/Tashkent, yozgi vaqt yo'q
+TASHKENT_TZ = ZoneInfo("Asia/Tashkent")
+
+PRAYER_KEYS = ["Fajr", "Sunrise", "Dhuhr", "Asr", "Maghrib", "Isha"]
+
+# (shaharlar, kunlar, 6) o'lchamli jadval: yarim tundan beri daqiqalar (int16)
+_timetable: Optional[np.ndarray] = None
+_timetable_year: Optional[int] = None
+_city_index: Dict[str, int] = {}
+
+
+def today_local() -> date:
+    """Toshkent bo'yicha bugungi sana (server vaqt zonasidan qat'i nazar)"""
+    return datetime.now(TASHKENT_TZ).date()
+
+
+def _hour_angle(altitude, lat, decl):
+    """Quyosh berilgan balandlikka yetadigan soat burchagi (soatlarda)"""
+    cos_h = (np.sin(np.radians(altitude)) - np.sin(lat) * np.sin(decl)) / (np.cos(lat) * np.cos(decl))
+    return np.degrees(np.arccos(np.clip(cos_h, -1.0, 1.0))) / 15.0
+
+
+def compute_timetable(year: int, lats, lons, method: str = PRAYER_CALC_METHOD) -> np.ndarray:
+    """Barcha shaharlar va yilning barcha kunlari uchun vaqtlarni bitta vektor hisobida chiqarish"""
+    angles = METHODS[method]
+    lats = np.asarray(lats, dtype=np.float64)[:, None]
+    lons = np.asarray(lons, dtype=np.float64)[:, None]
+    days = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+    # Har bir shahar uchun mahalliy quyosh peshinidagi J2000 kun raqami
+    first_day = date(year, 1, 1).toordinal() - date(2000, 1, 1).toordinal()
+    d = np.arange(days, dtype=np.float64)[None, :] + first_day - lons / 360.0
+
+    # Quyosh koordinatalari (praytimes algoritmi)
+    g = np.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    ecl_lon = np.radians((q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g)) % 360)
+    obliquity = np.radians(23.439 - 0.00000036 * d)
+    right_ascension = (np.degrees(np.arctan2(np.cos(obliquity) * np.sin(ecl_lon), np.cos(ecl_lon))) / 15.0) % 24
+    decl = np.arcsin(np.sin(obliquity) * np.sin(ecl_lon))
+    equation_of_time = q / 15.0 - right_ascension
+    equation_of_time = (equation_of_time + 12) % 24 - 12
+
+    lat = np.radians(lats)
+    dhuhr = 12 + UTC_OFFSET - lons / 15.0 - equation_of_time
+    sunrise_angle = _hour_angle(SUNRISE_ALTITUDE, lat, decl)
+    asr_altitude = np.degrees(np.arctan(1.0 / (ASR_SHADOW_FACTOR + np.tan(np.abs(lat - decl)))))
+
+    maghrib_angle = _hour_angle(-angles["maghrib"], lat, decl) if angles["maghrib"] else sunrise_angle
+
+    hours = np.stack([
+        dhuhr - _hour_angle(-angles["fajr"], lat, decl),
+        dhuhr - sunrise_angle,
+        dhuhr,
+        dhuhr + _hour_angle(asr_altitude, lat, decl),
+        dhuhr + maghrib_angle,
+        dhuhr + _hour_angle(-angles["isha"], lat, decl),
+    ], axis=-1)
+    return np.rint(hours * 60).astype(np.int16) % 1440
+
+
+def build_timetable(year: Optional[int] = None) -> np.ndarray:
+    """regions.py dagi barcha shaharlar uchun yillik jadvalni tuzish"""
+    global _timetable, _timetable_year, _city_index
+    year = year or today_local().year
+    cities = list(coordinates)
+    lats, lons = zip(*(coordinates[city] for city in cities))
+    _timetable = compute_timetable(year, lats, lons)
+    _timetable_year = year
+    _city_index = {city: i for i, city in enumerate(cities)}
+    logging.info(f"Offline prayer timetable built: year={year}, cities={len(cities)}, bytes={_timetable.nbytes}")
+    return _timetable
+
+
+def get_local_prayer_times(city: str, day: Optional[date] = None) -> Optional[dict]:
+    day = day or today_local()
+    index = _city_index.get(city)
+    if index is None and _timetable is not None:
+        return None
+    if _timetable is None or _timetable_year != day.year:
+        build_timetable(day.year)
+        index = _city_index.get(city)
+        if index is None:
+            return None
+    row = _timetable[index, day.timetuple().tm_yday - 1]
+    return {key: f"{minutes // 60:02d}:{minutes % 60:02d}" for key, minutes in zip(PRAYER_KEYS, row.tolist())}
+
+
+def get_local_month_rows(year: int, month: int) -> list:
+    """Barcha shaharlar uchun oylik (city, date, fajr, sunrise, dhuhr, asr, maghrib, isha) qatorlari"""
+    if _timetable is None or _timetable_year != year:
+        build_timetable(year)
+    start = date(year, month, 1).timetuple().tm_yday - 1
+    days = calendar.monthrange(year, month)[1]
+    block = _timetable[:, start:start + days].tolist()
+    return [
+        (city, date(year, month, offset + 1), *(time(minutes // 60, minutes % 60) for minutes in row))
+        for city, index in _city_index.items()
+        for offset, row in enumerate(block[index])
+    ]
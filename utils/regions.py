@@ -47,4 +47,71 @@ regions = {
         "Urganch", "Xiva", "Hazorasp", "Qo‘shko‘pir", "Yangibozor",
         "Amudaryo", "Bog‘ot", "Gurlan", "Shovot", "Tuproqqal‘a", "Xonqa"
     ]
-}
\ No newline at end of file
+}
+
+# Shahar/tuman markazlarining taxminiy koordinatalari (kenglik, uzunlik)
+coordinates = {
+    # Toshkent
+    "Toshkent": (41.2995, 69.2401), "Chirchiq": (41.4689, 69.5822), "Bekobod": (40.2214, 69.2697),
+    "Olmaliq": (40.8447, 69.5983), "Yangiyo‘l": (41.1122, 69.0472), "Parkent": (41.2944, 69.6764),
+    "Angren": (41.0167, 70.1436), "Nurafshon": (41.0442, 69.3583), "Ohangaron": (40.9064, 69.6383),
+    "Qibray": (41.3897, 69.4650), "Oqqo‘rg‘on": (40.8767, 69.0450), "Piskent": (40.8972, 69.3506),
+    "Bo‘stonliq": (41.5597, 69.7708), "Zangiota": (41.1919, 69.1458), "Yuqori Chirchiq": (41.3550, 69.5800),
+    # Samarqand
+    "Samarqand": (39.6542, 66.9597), "Kattaqo‘rg‘on": (39.8989, 66.2561), "Urgut": (39.4022, 67.2431),
+    "Ishtixon": (39.9661, 66.4861), "Narpay": (39.9200, 65.7700), "Past Darg‘om": (39.7106, 66.6614),
+    "Payariq": (40.0000, 66.9300), "Qo‘shrabot": (40.2667, 66.6833), "Bulung‘ur": (39.7628, 67.2717),
+    "Jomboy": (39.6989, 67.0933), "Oqdaryo": (39.8600, 66.8400), "Toyloq": (39.5900, 67.1200),
+    "Koshrabod": (40.2667, 66.6833), "Poytug‘": (40.8997, 72.2486), "Qorako‘l": (39.5275, 63.8528),
+    # Buxoro
+    "Buxoro": (39.7747, 64.4286), "G‘ijduvon": (40.1000, 64.6833), "Kogon": (39.7228, 64.5517),
+    "Vobkent": (40.0233, 64.5139), "Romitan": (39.9331, 64.3800), "Shofirkon": (40.1200, 64.5011),
+    "Olot": (39.4144, 63.8047), "Jondor": (39.7328, 64.1839), "Qorovulbozor": (39.5000, 64.7939),
+    "Peshku": (40.1300, 64.2900), "Kogon tuman": (39.7500, 64.5000),
+    # Farg'ona
+    "Farg‘ona": (40.3864, 71.7864), "Qo‘qon": (40.5286, 70.9425), "Marg‘ilon": (40.4711, 71.7247),
+    "Rishton": (40.3567, 71.2847), "Quva": (40.5222, 72.0722), "Oltiariq": (40.3906, 71.4783),
+    "Buvayda": (40.6000, 71.0500), "Dang‘ara": (40.5833, 70.9167), "Furqat": (40.5700, 71.3000),
+    "Yozyovon": (40.6500, 71.7400), "O‘zbekiston": (40.3764, 70.8158), "Toshloq": (40.4772, 71.7678),
+    "Uchko‘prik": (40.5300, 71.0500),
+    # Andijon
+    "Andijon": (40.7821, 72.3442), "Asaka": (40.6417, 72.2387), "Xonobod": (40.8036, 73.0036),
+    "Baliqchi": (40.8908, 71.8625), "Shahrixon": (40.7133, 72.0569), "Xo‘jaobod": (40.6678, 72.5600),
+    "Marhamat": (40.4975, 72.3203), "Andijon tuman": (40.8500, 72.3000), "Buloqboshi": (40.6222, 72.5044),
+    "Izboskan": (40.8997, 72.2486), "Jalolquduq": (40.7250, 72.6417), "Paxtaobod": (40.9297, 72.4972),
+    "Ulug‘nor": (40.7800, 71.6900),
+    # Namangan
+    "Namangan": (40.9983, 71.6726), "Chust": (41.0033, 71.2378), "Pop": (40.8736, 71.1089),
+    "To‘raqo‘rg‘on": (41.0000, 71.5167), "Uychi": (41.0806, 71.9233), "Mingbuloq": (40.9000, 71.4000),
+    "Namangan tuman": (40.9700, 71.7500), "Norin": (40.9200, 72.1100), "Uchqurg‘on": (41.1131, 72.0797),
+    "Yangiqo‘rg‘on": (41.1900, 71.7200), "Kosonsoy": (41.2489, 71.5472),
+    # Navoiy
+    "Navoiy": (40.0844, 65.3792), "Zarafshon": (41.5747, 64.2011), "Karmana": (40.1333, 65.3667),
+    "Konimex": (40.2833, 65.1500), "Qiziltepa": (40.0333, 64.8500), "Navoiy tuman": (40.1000, 65.4000),
+    "Nurota": (40.5614, 65.6886), "Uchquduq": (42.1567, 63.5553), "Tomdi": (41.7500, 64.6200),
+    "Xatirchi": (40.0200, 65.9600),
+    # Qashqadaryo
+    "Qarshi": (38.8606, 65.7891), "Shahrisabz": (39.0578, 66.8342), "Kitob": (39.1186, 66.8814),
+    "Kasbi": (38.9500, 65.5000), "Yakkabog‘": (38.9767, 66.6833), "Muborak": (39.2553, 65.1528),
+    "G‘uzor": (38.6208, 66.2481), "Chiroqchi": (39.0336, 66.5722), "Dehqonobod": (38.3500, 66.5300),
+    "Koson": (39.0375, 65.5850), "Nishon": (38.6600, 65.6700), "Qamashi": (38.8167, 66.4500),
+    # Surxondaryo
+    "Termiz": (37.2242, 67.2783), "Denov": (38.2667, 67.8986), "Sherobod": (37.6667, 67.0167),
+    "Boysun": (38.2069, 67.2081), "Qumqo‘rg‘on": (37.8200, 67.5800), "Sariosiyo": (38.4125, 67.9597),
+    "Angor": (37.4600, 67.1300), "Bandixon": (37.8600, 67.4000), "Muzrabot": (37.4300, 66.9800),
+    "Oltinsoy": (38.1300, 67.7300), "Sherobod tuman": (37.7000, 66.9800), "Termiz tuman": (37.3000, 67.3500),
+    # Jizzax
+    "Jizzax": (40.1158, 67.8422), "Zomin": (39.9600, 68.3953), "G‘allaorol": (40.0222, 67.5931),
+    "Paxtakor": (40.3153, 67.9544), "Forish": (40.4500, 67.2000), "Arnasoy": (40.6000, 67.9000),
+    "Baxmal": (39.7400, 67.6500), "Do‘stlik": (40.5247, 68.0358), "Sharof Rashidov": (40.2000, 67.9000),
+    "Yangiobod": (39.9700, 68.8200),
+    # Sirdaryo
+    "Guliston": (40.4897, 68.7842), "Shirin": (40.2333, 69.1333), "Yangiyer": (40.2750, 68.8225),
+    "Boyovut": (40.4000, 68.9800), "Sayxunobod": (40.6600, 68.7700), "Sirdaryo tuman": (40.8500, 68.6667),
+    "Xovos": (40.2200, 68.8400), "Mirzaobod": (40.3800, 68.6200),
+    # Xorazm
+    "Urganch": (41.5500, 60.6333), "Xiva": (41.3783, 60.3639), "Hazorasp": (41.3200, 61.0742),
+    "Qo‘shko‘pir": (41.5356, 60.3456), "Yangibozor": (41.7200, 60.5800), "Amudaryo": (42.1200, 60.0600),
+    "Bog‘ot": (41.3500, 60.8200), "Gurlan": (41.8436, 60.3919), "Shovot": (41.6556, 60.3028),
+    "Tuproqqal‘a": (41.0500, 61.2500), "Xonqa": (41.4736, 60.7764),
+}
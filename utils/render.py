@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+
+from config import RENDER_DEBOUNCE_MS
+
+MAX_REMEMBERED_MESSAGES = 10000
+
+# (chat_id, message_id) -> oxirgi yuborilgan (matn, klaviatura JSON)
+_last_sent: "OrderedDict[Tuple[int, int], Tuple[str, str]]" = OrderedDict()
+_scheduled: Dict[Tuple[int, int], asyncio.Task] = {}
+render_stats = {"requested": 0, "edits_sent": 0, "markup_only": 0, "edits_avoided": 0}
+
+
+def _markup_key(markup: InlineKeyboardMarkup) -> str:
+    return markup.model_dump_json(exclude_none=True)
+
+
+def remember_render(chat_id: int, message_id: int, text: str, markup: InlineKeyboardMarkup):
+    """Xabar boshqa joyda yuborilgan/tahrirlangan bo'lsa, uning holatini eslab qolish"""
+    key = (chat_id, message_id)
+    _last_sent[key] = (text, _markup_key(markup))
+    _last_sent.move_to_end(key)
+    while len(_last_sent) > MAX_REMEMBERED_MESSAGES:
+        _last_sent.popitem(last=False)
+
+
+async def _render(bot: Bot, chat_id: int, message_id: int,
+                  build: Callable[[], Awaitable[Tuple[str, InlineKeyboardMarkup]]]):
+    key = (chat_id, message_id)
+    try:
+        await asyncio.sleep(RENDER_DEBOUNCE_MS / 1000)
+    finally:
+        _scheduled.pop(key, None)
+
+    text, markup = await build()
+    markup_key = _markup_key(markup)
+    last = _last_sent.get(key)
+    try:
+        if last == (text, markup_key):
+            render_stats["edits_avoided"] += 1
+            return
+        if last is not None and last[0] == text:
+            # Faqat sonlar o'zgargan: matnni qayta yubormaymiz
+            await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=markup)
+            render_stats["markup_only"] += 1
+        else:
+            await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id,
+                                        reply_markup=markup, parse_mode="HTML")
+        render_stats["edits_sent"] += 1
+        remember_render(chat_id, message_id, text, markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" in str(e):
+            remember_render(chat_id, message_id, text, markup)
+            render_stats["edits_avoided"] += 1
+        else:
+            logging.error(f"Menyuni yangilashda xato: chat_id={chat_id}, message_id={message_id}, {e}")
+    except Exception as e:
+        logging.error(f"Menyuni yangilashda xato: chat_id={chat_id}, message_id={message_id}, {e}")
+
+
+def schedule_render(bot: Bot, chat_id: int, message_id: int,
+                    build: Callable[[], Awaitable[Tuple[str, InlineKeyboardMarkup]]]):
+    """
+    Xabarni qisqa oynadan keyin bir marta yangilash.
+    Oyna ichidagi keyingi bosishlar yangi tahrir yaratmaydi - oxirgi holat yuboriladi.
+    """
+    key = (chat_id, message_id)
+    render_stats["requested"] += 1
+    if key in _scheduled:
+        render_stats["edits_avoided"] += 1
+        return
+    _scheduled[key] = asyncio.create_task(_render(bot, chat_id, message_id, build))
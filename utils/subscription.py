@@ -1,19 +1,106 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest
-import logging
+
+from config import SUBSCRIPTION_CACHE_TTL, SUBSCRIPTION_NEGATIVE_TTL
+from database.db import get_channels_version, get_channel_memberships, set_channel_members
+
+SUBSCRIBED_STATUSES = ("member", "administrator", "creator")
+MAX_CACHED_ENTRIES = 100000
+
+# (user_id, channel) -> (obuna bo'lganmi, amal qilish muddati)
+_cache: Dict[Tuple[int, str], Tuple[bool, float]] = {}
+_cache_version: int = 0
+subscription_stats = {"hits": 0, "db_hits": 0, "misses": 0}
+
+
+def _cached(user_id: int, channel: str) -> Optional[bool]:
+    global _cache_version
+    version = get_channels_version()
+    if version != _cache_version:
+        # Kanallar ro'yxati o'zgargan
+        _cache.clear()
+        _cache_version = version
+    entry = _cache.get((user_id, channel))
+    if entry is None or entry[1] < time.monotonic():
+        return None
+    return entry[0]
+
+
+def _remember(user_id: int, channel: str, subscribed: bool):
+    if len(_cache) >= MAX_CACHED_ENTRIES:
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in _cache.items() if expires_at < now]:
+            del _cache[key]
+        if len(_cache) >= MAX_CACHED_ENTRIES:
+            _cache.clear()
+    ttl = SUBSCRIPTION_CACHE_TTL if subscribed else SUBSCRIPTION_NEGATIVE_TTL
+    _cache[(user_id, channel)] = (subscribed, time.monotonic() + ttl)
+
+
+def member_status(member) -> str:
+    """ChatMember holatini oddiy satrga aylantirish (enum bo'lishi mumkin)"""
+    return getattr(member.status, "value", member.status)
+
+
+def remember_member_status(user_id: int, channel: str, status: str):
+    """chat_member yangilanishi kelganda keshni darhol yangilash"""
+    _remember(user_id, channel, status in SUBSCRIBED_STATUSES)
+
+
+async def _fetch_status(user_id: int, bot: Bot, channel: str) -> Optional[str]:
+    try:
+        member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
+        return member_status(member)
+    except TelegramBadRequest as e:
+        logging.error(f"TelegramBadRequest in check_subscription: channel={channel}, user_id={user_id}, {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error in check_subscription: channel={channel}, user_id={user_id}, {e}")
+    return None
+
 
 async def check_subscription(user_id: int, bot: Bot, required_channels: list) -> bool:
+    """
+    Avval xotira keshi, keyin channel_members jadvali tekshiriladi.
+    Jadvaldagi faqat obuna bo'lgan yozuvlarga ishoniladi; yozuvi yo'q yoki obuna bo'lmagan
+    (chat_member yangilanishi kelmagan bo'lishi mumkin) kanallar uchun get_chat_member bir vaqtda chaqiriladi.
+    """
+    results = {}
+    unknown = []
     for channel in required_channels:
-        try:
-            member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
-            if member.status not in ("member", "administrator", "creator"):
-                logging.warning(f"User not subscribed: user_id={user_id}, channel={channel}")
-                return False
-        except TelegramBadRequest as e:
-            logging.error(f"TelegramBadRequest in check_subscription: channel={channel}, user_id={user_id}, {e}")
-            return False
-        except Exception as e:
-            logging.error(f"Unexpected error in check_subscription: channel={channel}, user_id={user_id}, {e}")
-            return False
+        cached = _cached(user_id, channel)
+        if cached is None:
+            unknown.append(channel)
+        else:
+            results[channel] = cached
+    subscription_stats["hits"] += len(results)
+
+    if unknown:
+        known = {channel: status for channel, status in (await get_channel_memberships(user_id, unknown)).items()
+                 if status in SUBSCRIBED_STATUSES}
+        subscription_stats["db_hits"] += len(known)
+        for channel, status in known.items():
+            remember_member_status(user_id, channel, status)
+            results[channel] = True
+        unknown = [channel for channel in unknown if channel not in known]
+
+    if unknown:
+        subscription_stats["misses"] += len(unknown)
+        statuses = await asyncio.gather(*(_fetch_status(user_id, bot, channel) for channel in unknown))
+        fetched = [(channel, user_id, status) for channel, status in zip(unknown, statuses) if status is not None]
+        for channel, _, status in fetched:
+            remember_member_status(user_id, channel, status)
+        await set_channel_members(fetched)
+        for channel, status in zip(unknown, statuses):
+            results[channel] = status in SUBSCRIBED_STATUSES
+
+    missing = [channel for channel in required_channels if not results.get(channel)]
+    if missing:
+        logging.warning(f"User not subscribed: user_id={user_id}, channels={missing}")
+        return False
     logging.info(f"User subscribed to all channels: user_id={user_id}")
-    return True
\ No newline at end of file
+    return True
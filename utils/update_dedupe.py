@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from config import UPDATE_DEDUPE_MODE, UPDATE_DEDUPE_SIZE
+from database.db import claim_update_ids
+
+logger = logging.getLogger(__name__)
+
+CLAIM_BATCH_SIZE = 200
+CLAIM_BATCH_DELAY = 0.005
+
+dedupe_stats = {"duplicates": 0, "db_duplicates": 0, "db_batches": 0}
+
+
+class UpdateDedupeMiddleware(BaseMiddleware):
+    """
+    Telegram qayta yuborgan update larni tashlab yuborish.
+    Oxirgi `size` ta update_id halqa bufer + set da saqlanadi; "postgres" rejimida
+    yangi id lar boshqa replikalar bilan processed_updates jadvali orqali bo'laklab tekshiriladi.
+    """
+
+    def __init__(self, size: int = UPDATE_DEDUPE_SIZE, mode: str = UPDATE_DEDUPE_MODE):
+        self.mode = mode
+        self._ring = deque(maxlen=size)
+        self._seen = set()
+        self._pending: List[Tuple[int, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def _remember(self, update_id: int):
+        if len(self._ring) == self._ring.maxlen:
+            self._seen.discard(self._ring[0])
+        self._ring.append(update_id)
+        self._seen.add(update_id)
+
+    async def _flush(self):
+        await asyncio.sleep(CLAIM_BATCH_DELAY)
+        while self._pending:
+            batch, self._pending = self._pending[:CLAIM_BATCH_SIZE], self._pending[CLAIM_BATCH_SIZE:]
+            claimed = await claim_update_ids([update_id for update_id, _ in batch])
+            dedupe_stats["db_batches"] += 1
+            for update_id, future in batch:
+                if not future.done():
+                    # Bazaga yozib bo'lmasa (None) update ishlanadi
+                    future.set_result(claimed is None or update_id in claimed)
+        self._flush_task = None
+
+    async def _claim(self, update_id: int) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((update_id, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+        update_id = event.update_id
+        if update_id in self._seen:
+            dedupe_stats["duplicates"] += 1
+            logger.info(f"Takroriy update tashlab yuborildi: update_id={update_id}")
+            return None
+        self._remember(update_id)
+        if self.mode == "postgres" and not await self._claim(update_id):
+            dedupe_stats["db_duplicates"] += 1
+            logger.info(f"Takroriy update (boshqa replika) tashlab yuborildi: update_id={update_id}")
+            return None
+        return await handler(event, data)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from config import WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Webhook darhol javob qaytaradi; update lar chat bo'yicha navbatlarga bo'linadi:
+# bir chatning update lari tartib bilan, turli chatlarniki parallel ishlanadi
+_queues: List[asyncio.Queue] = []
+_workers: List[asyncio.Task] = []
+queue_stats = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+# Update turlari va ularda chat/foydalanuvchi id si joylashgan yo'llar
+_CHAT_PATHS = (("chat", "id"), ("message", "chat", "id"), ("from", "id"), ("user", "id"))
+
+
+def _shard_key(update: dict) -> int:
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        for path in _CHAT_PATHS:
+            value = event
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            if isinstance(value, int):
+                return value
+    return update.get("update_id", 0)
+
+
+async def _worker(queue: asyncio.Queue, dp: Dispatcher, bot: Bot):
+    while True:
+        update = await queue.get()
+        try:
+            await dp.feed_raw_update(bot, update)
+            queue_stats["processed"] += 1
+        except Exception as e:
+            queue_stats["failed"] += 1
+            logger.error(f"Update ishlashda xato: update_id={update.get('update_id')}, {e}")
+        finally:
+            queue.task_done()
+
+
+def enqueue_update(update: dict) -> bool:
+    """Navbat to'lgan bo'lsa False (Telegram keyinroq qayta yuboradi)"""
+    queue = _queues[_shard_key(update) % len(_queues)]
+    try:
+        queue.put_nowait(update)
+    except asyncio.QueueFull:
+        queue_stats["rejected"] += 1
+        return False
+    queue_stats["accepted"] += 1
+    return True
+
+
+def get_queue_stats() -> dict:
+    depths = [queue.qsize() for queue in _queues]
+    return {
+        **queue_stats,
+        "depth": sum(depths),
+        "max_shard_depth": max(depths, default=0),
+        "capacity": sum(queue.maxsize for queue in _queues),
+    }
+
+
+async def handle_webhook(request: web.Request) -> web.Response:
+    try:
+        update = await request.json()
+    except Exception:
+        return web.Response(status=400)
+    if not enqueue_update(update):
+        logger.warning(f"Update navbati to'lgan, 429 qaytarildi: update_id={update.get('update_id')}")
+        return web.Response(status=429, headers={"Retry-After": "1"})
+    return web.Response()
+
+
+def start_update_queue(dp: Dispatcher, bot: Bot, workers: int = WEBHOOK_WORKERS,
+                       queue_size: int = WEBHOOK_QUEUE_SIZE):
+    if _workers:
+        return
+    shard_size = max(queue_size // workers, 1)
+    for _ in range(workers):
+        queue = asyncio.Queue(maxsize=shard_size)
+        _queues.append(queue)
+        _workers.append(asyncio.create_task(_worker(queue, dp, bot)))
+    logger.info(f"Webhook update navbati ishga tushdi: workers={workers}, queue_size={shard_size * workers}")
+
+
+async def stop_update_queue(timeout: Optional[float] = 10):
+    """Navbatdagi update larni ishlab bo'lishni kutish, keyin ishchilarni to'xtatish"""
+    if not _workers:
+        return
+    try:
+        await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in _queues)), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Navbatda ishlanmagan update lar qoldi: {sum(queue.qsize() for queue in _queues)}")
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+    _queues.clear()